@@ -0,0 +1,152 @@
+"""Задержка от обновления до ответа бота: long polling против webhook.
+
+Бот запускается отдельным процессом и ходит в поддельный Bot API
+(benchmarks/fake_telegram.py). Каждое обновление - /start от нового
+пользователя; задержка считается от отправки обновления до sendMessage.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_modes
+    python -m benchmarks.bench_modes --updates 500 --concurrency 50 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.fake_telegram import FakeTelegram, message_update
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:bench"
+SECRET = "bench-secret"
+WEBHOOK_PATH = "/webhook"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def start_bot(mode: str, api_url: str, port: int, workers: int, workdir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        BOT_TOKEN=TOKEN,
+        BOT_MODE=mode,
+        TELEGRAM_API_URL=api_url,
+        WEBHOOK_HOST="127.0.0.1",
+        WEBHOOK_PORT=str(port),
+        WEBHOOK_PATH=WEBHOOK_PATH,
+        WEBHOOK_SECRET=SECRET,
+        WEB_WORKERS=str(workers),
+        REFRESH_INTERVAL="0",
+        SEND_LIMITS="0",  # Меряем режим получения обновлений, а не очередь с лимитами Telegram
+    )
+    env.pop("WEBHOOK_URL", None)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py")],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_webhook(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("webhook-сервер бота не запустился")
+
+
+async def run_mode(mode: str, updates: int, concurrency: int, workers: int) -> tuple:
+    telegram = FakeTelegram(port=free_port())
+    await telegram.start()
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+    process = start_bot(mode, telegram.base_url, port, workers, workdir)
+    webhook_url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+    latencies = []
+    try:
+        if mode == "polling":
+            await asyncio.wait_for(telegram.polled.wait(), 30)
+        else:
+            await wait_webhook(port)
+
+        async with aiohttp.ClientSession() as session:
+            async def deliver(update: dict):
+                if mode == "polling":
+                    telegram.push(update)
+                else:
+                    async with session.post(
+                        webhook_url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+                    ) as response:
+                        response.raise_for_status()
+
+            async def one(update_id: int, record: bool):
+                chat_id = 10_000 + update_id
+                reply = telegram.expect_reply(chat_id)
+                start = time.perf_counter()
+                await deliver(message_update(update_id, chat_id, "/start"))
+                done = await asyncio.wait_for(reply, 30)
+                if record:
+                    latencies.append((done - start) * 1000)
+
+            slots = asyncio.Semaphore(concurrency)
+
+            async def limited(update_id: int, record: bool):
+                async with slots:
+                    await one(update_id, record)
+
+            # Прогрев: первые обновления открывают базы и соединения
+            await asyncio.gather(*(limited(i, False) for i in range(1, 11)))
+            started = time.perf_counter()
+            await asyncio.gather(*(limited(i, True) for i in range(11, 11 + updates)))
+            elapsed = time.perf_counter() - started
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        await telegram.stop()
+    return latencies, elapsed
+
+
+def report(mode: str, latencies: list, elapsed: float):
+    print(
+        f"{mode:<10}{percentile(latencies, 50):8.1f}{percentile(latencies, 95):8.1f}"
+        f"{percentile(latencies, 99):8.1f}{sum(latencies) / len(latencies):8.1f}{len(latencies) / elapsed:10.1f}"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--updates", type=int, default=200, help="обновлений на режим")
+    arg_parser.add_argument("--concurrency", type=int, default=10, help="обновлений в обработке одновременно")
+    arg_parser.add_argument("--workers", type=int, default=1, help="процессов бота в режиме webhook")
+    arg_parser.add_argument("--modes", default="polling,webhook")
+    args = arg_parser.parse_args()
+
+    print(f"{'режим':<10}{'p50':>8}{'p95':>8}{'p99':>8}{'сред.':>8}{'обн/с':>10}   (задержка, мс)")
+    for mode in args.modes.split(","):
+        latencies, elapsed = asyncio.run(run_mode(mode, args.updates, args.concurrency, args.workers))
+        report(mode if mode == "polling" else f"{mode}x{args.workers}", latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Сравнение времени разбора страницы: полный html.parser против быстрого парсера с частичным разбором.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --html saved_page.html --repeat 50
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from utils.soup import PARSER_BACKEND, POSTS_BLOCK, LONGREAD_PARTS, make_soup
+
+
+def synthetic_home_page(cards: int = 40) -> str:
+    """Страница, похожая на главную kadrovik.uz: тяжёлый <head>, меню, блок публикаций."""
+    head = "".join(f"<script>var x{i} = {'{'}a: {i}{'}'};</script><style>.c{i} {{color: red}}</style>" for i in range(150))
+    nav = "".join(f'<li><a href="/publish/group{i}">Раздел {i}</a></li>' for i in range(80))
+    posts = "".join(
+        f'<li class="post-card-wrapper"><a href="/publish/doc/text{i}_statya">'
+        f'<h4 class="post-card__title">Статья номер {i} о трудовом законодательстве</h4></a>'
+        f'<time class="longread-post__time-published" datetime="2024-01-{i % 28 + 1:02d}">дата</time></li>'
+        for i in range(cards)
+    )
+    other = "".join(f'<section class="banner"><div><p>Реклама {i}</p></div></section>' for i in range(60))
+    return (
+        f"<html><head>{head}</head><body><header><ul>{nav}</ul></header>{other}"
+        f'<section class="posts-block"><ul class="posts-list">{posts}</ul></section>'
+        f"<footer><ul>{nav}</ul></footer></body></html>"
+    )
+
+
+def synthetic_longread(paragraphs: int = 300) -> str:
+    """Длинная статья-лонгрид с заголовками <strong> внутри section.longread-block."""
+    head = "".join(f"<script>var y{i} = {i};</script>" for i in range(150))
+    body = "".join(
+        f"<p><strong>Раздел {i}</strong></p>" if i % 10 == 0 else
+        f"<p>Абзац {i}: работодатель обязан предоставить работнику ежегодный отпуск продолжительностью не менее 21 дня.</p>"
+        for i in range(paragraphs)
+    )
+    nav = "".join(f'<li><a href="/publish/group{i}">Раздел {i}</a></li>' for i in range(80))
+    return (
+        f"<html><head>{head}</head><body><header><ul>{nav}</ul></header>"
+        f'<h1>Ежегодный отпуск</h1><time class="longread-post__time-published" datetime="2024-05-01">1 мая</time>'
+        f'<section class="longread-block">{body}</section><footer><ul>{nav}</ul></footer></body></html>'
+    )
+
+
+def timeit(func, repeat: int) -> float:
+    """Среднее время одного вызова, мс."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_page(name: str, html: str, strainer, repeat: int):
+    before = timeit(lambda: BeautifulSoup(html, "html.parser"), repeat)
+    backend_full = timeit(lambda: make_soup(html), repeat)
+    after = timeit(lambda: make_soup(html, strainer), repeat)
+    print(f"{name} ({len(html) // 1024} КБ):")
+    print(f"  {'до:    html.parser, вся страница':<40}{before:8.2f} мс")
+    print(f"  {'после: ' + PARSER_BACKEND + ', вся страница':<40}{backend_full:8.2f} мс")
+    print(f"  {'после: ' + PARSER_BACKEND + ', частичный разбор':<40}{after:8.2f} мс  (x{before / after:.1f})")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--html", help="сохранённая страница kadrovik.uz вместо синтетической")
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    print(f"Парсер: {PARSER_BACKEND}\n")
+    if args.html:
+        with open(args.html, encoding="utf-8") as f:
+            html = f.read()
+        bench_page(args.html, html, LONGREAD_PARTS, args.repeat)
+        return
+    bench_page("Главная (section.posts-block)", synthetic_home_page(), POSTS_BLOCK, args.repeat)
+    bench_page("Лонгрид (h1/time/section)", synthetic_longread(), LONGREAD_PARTS, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Офлайн-бенчмарк парсеров на записанных страницах kadrovik.uz.
+
+Для каждой функции извлечения и каждой подходящей фикстуры измеряет время
+на страницу, пропускную способность и пиковую память (tracemalloc), а также
+число найденных статей. Результаты можно сохранить и сравнивать с ними
+следующие запуски: процессорное время нормируется на калибровочный прогон, поэтому
+сравнение переносимо между машинами. При регрессии скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_parsers --save benchmarks/baseline.json
+    python -m benchmarks.bench_parsers --compare benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from utils import parser, parsing_rubriki
+from utils.soup import PARSER_BACKEND
+
+from benchmarks.record_fixtures import FIXTURES_DIR, MANIFEST
+
+# Что измеряем: имя -> (вид фикстур, функция извлечения(html, url)).
+# Это та часть fetch_articles_from_site, fetch_rubrika_articles, get_categories_from_main_page
+# и обеих fetch_article_content, которая выполняется в пуле разбора.
+TARGETS = {
+    "parser.extract_articles": (
+        "listing",
+        lambda html, url: parser.extract_articles(html, "https://kadrovik.uz/uz/" if "/uz/" in url else "https://kadrovik.uz/", 10),
+    ),
+    "parsing_rubriki.extract_rubrika_articles": ("rubrika", parsing_rubriki.extract_rubrika_articles),
+    "parsing_rubriki.extract_categories": ("categories", lambda html, url: parsing_rubriki.extract_categories(html)),
+    "parser.extract_article_content": ("longread", lambda html, url: parser.extract_article_content(html)),
+    "parsing_rubriki.extract_article_content": ("longread", lambda html, url: parsing_rubriki.extract_article_content(html)),
+}
+
+
+def load_fixtures() -> dict:
+    path = os.path.join(FIXTURES_DIR, MANIFEST)
+    if not os.path.exists(path):
+        sys.exit(f"Нет фикстур в {FIXTURES_DIR}: запустите python -m benchmarks.record_fixtures")
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    for entry in manifest.values():
+        with open(os.path.join(FIXTURES_DIR, entry["file"]), encoding="utf-8") as f:
+            entry["html"] = f.read()
+    return manifest
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Время фиксированной нагрузки на чистом Python, мс: масштаб для сравнения между машинами."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        total = 0
+        for i in range(300_000):
+            total += len(str(i)) * (i % 7)
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+def measure(func, html: str, url: str, repeat: int) -> dict:
+    # Меряем процессорное время процесса: на общей виртуальной машине настенное
+    # время скачет из-за соседей, а CPU-время почти нет
+    func(html, url)  # Прогрев
+    best = float("inf")
+    for _ in range(repeat):
+        # Дерево bs4 полно циклических ссылок: сборщик мусора не должен срабатывать внутри замера
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.process_time()
+            result = func(html, url)
+            best = min(best, time.process_time() - start)
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    func(html, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": best * 1000, "peak_kb": peak / 1024, "result": result}
+
+
+def run(manifest: dict, repeat: int, only: str = None) -> dict:
+    results = {}
+    for target, (kind, func) in TARGETS.items():
+        if only and only not in target:
+            continue
+        print(f"\n{target}")
+        for name, entry in manifest.items():
+            if kind not in entry["kinds"]:
+                continue
+            m = measure(func, entry["html"], entry["url"], repeat)
+            page_kb = len(entry["html"].encode("utf-8")) / 1024
+            results[f"{target}:{name}"] = {
+                "ms": m["ms"],
+                "peak_kb": m["peak_kb"],
+                "items": len(m["result"]),
+            }
+            print(
+                f"  {name:<12}{page_kb:7.0f} КБ{m['ms']:9.2f} мс{1000 / m['ms']:8.1f} стр/с"
+                f"{page_kb / 1024 / m['ms'] * 1000:7.1f} МБ/с{m['peak_kb'] / 1024:8.1f} МБ пик   результат: {len(m['result'])}"
+            )
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float, memory_tolerance: float) -> list:
+    """Список регрессий относительно сохранённых результатов."""
+    scale = current["calibration_ms"] / baseline["calibration_ms"]
+    problems = []
+    for key, base in baseline["results"].items():
+        now = current["results"].get(key)
+        if now is None:
+            continue
+        expected_ms = base["ms"] * scale
+        if now["ms"] > expected_ms * (1 + tolerance):
+            problems.append(f"{key}: {now['ms']:.2f} мс вместо ~{expected_ms:.2f} мс (+{now['ms'] / expected_ms - 1:.0%})")
+        if now["peak_kb"] > base["peak_kb"] * (1 + memory_tolerance):
+            problems.append(f"{key}: пик памяти {now['peak_kb']:.0f} КБ вместо {base['peak_kb']:.0f} КБ")
+        if base["items"] and not now["items"]:
+            problems.append(f"{key}: парсер больше ничего не находит (было {base['items']})")
+    return problems
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=20, help="прогонов на страницу, берётся лучший")
+    arg_parser.add_argument("--only", help="мерить только функции, в имени которых есть эта строка")
+    arg_parser.add_argument("--save", help="сохранить результаты в JSON")
+    arg_parser.add_argument("--compare", help="сравнить с сохранёнными результатами")
+    arg_parser.add_argument("--tolerance", type=float, default=0.4, help="допустимое замедление, доля")
+    arg_parser.add_argument("--memory-tolerance", type=float, default=0.25, help="допустимый рост пика памяти, доля")
+    args = arg_parser.parse_args()
+
+    manifest = load_fixtures()
+    print(f"Парсер: {PARSER_BACKEND}, фикстур: {len(manifest)}")
+    current = {
+        "parser_backend": PARSER_BACKEND,
+        "calibration_ms": calibrate(),
+        "results": run(manifest, args.repeat, args.only),
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\nСохранено в {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("parser_backend") != PARSER_BACKEND:
+            print(f"\nВнимание: базовые результаты сняты с парсером {baseline.get('parser_backend')}")
+        problems = compare(current, baseline, args.tolerance, args.memory_tolerance)
+        if problems:
+            # Перед тем как объявить регрессию, перемеряем и берём лучшее из двух прогонов
+            print("\nЕсть отклонения, повторный прогон...")
+            calibration_ms = calibrate()
+            again = run(manifest, args.repeat, args.only)
+            for key, result in again.items():
+                # Сравниваем отношение к калибровке: лучшее из двух прогонов
+                current["results"][key]["ms"] = min(
+                    current["results"][key]["ms"], result["ms"] * current["calibration_ms"] / calibration_ms
+                )
+            problems = compare(current, baseline, args.tolerance, args.memory_tolerance)
+        if problems:
+            print("\nРЕГРЕССИИ:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print(f"\nРегрессий нет (допуск {args.tolerance:.0%} по времени, {args.memory_tolerance:.0%} по памяти)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Всплеск отправок: напрямую против очереди SendScheduler.
+
+Telegram моделируется в памяти: ответ занимает --rtt мс, при превышении
+лимитов (около 30 сообщений/с всего и 1/с в чат) приходит RetryAfter.
+Одновременно с ответами пользователям идёт рассылка; сравниваются задержка
+ответов пользователям, число потерянных сообщений и число RetryAfter.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_send_queue
+    python -m benchmarks.bench_send_queue --users 100 --replies 3 --broadcast 1000
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from utils.send_queue import SendScheduler, TokenBucket, bulk_sends
+
+
+class FloodLimitedTelegram:
+    """make_request с лимитами Telegram: при превышении - RetryAfter."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.retry_after = 0
+        self._global = TokenBucket(32, 35)
+        self._chats = {}
+
+    async def __call__(self, bot, method):
+        await asyncio.sleep(self.rtt)
+        chat = self._chats.setdefault(method.chat_id, TokenBucket(1, 4))
+        for bucket in (chat, self._global):
+            if bucket.delay() > 0:
+                self.retry_after += 1
+                raise TelegramRetryAfter(method, "Too Many Requests", math.ceil(bucket.delay()))
+        chat.take()
+        self._global.take()
+        return True
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))] if values else float("nan")
+
+
+async def run(scheduled: bool, users: int, replies: int, broadcast: int, rtt: float) -> dict:
+    telegram = FloodLimitedTelegram(rtt)
+    scheduler = SendScheduler()
+    latencies, lost = [], 0
+
+    async def send(chat_id: int, text: str):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if scheduled:
+            return await scheduler(telegram, None, method)
+        return await telegram(None, method)
+
+    async def user(chat_id: int):
+        nonlocal lost
+        for i in range(replies):
+            start = time.perf_counter()
+            try:
+                await send(chat_id, f"ответ {i}")
+                latencies.append((time.perf_counter() - start) * 1000)
+            except TelegramRetryAfter:
+                lost += 1  # Так ведёт себя обработчик с широким except: сообщение теряется
+
+    async def mailing():
+        nonlocal lost
+        with bulk_sends():
+            for chat_id in range(100_000, 100_000 + broadcast):
+                try:
+                    await send(chat_id, "рассылка")
+                except TelegramRetryAfter:
+                    lost += 1
+
+    await asyncio.gather(mailing(), *(user(chat_id) for chat_id in range(users)))
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "lost": lost,
+        "retry_after": telegram.retry_after,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=30, help="пользователей во всплеске")
+    arg_parser.add_argument("--replies", type=int, default=2, help="сообщений каждому пользователю")
+    arg_parser.add_argument("--broadcast", type=int, default=300, help="сообщений в рассылке")
+    arg_parser.add_argument("--rtt", type=float, default=20, help="время ответа Telegram, мс")
+    args = arg_parser.parse_args()
+
+    print(f"{'':<10}{'p50, мс':>10}{'p99, мс':>10}{'потеряно':>10}{'RetryAfter':>12}")
+    for name, scheduled in (("напрямую", False), ("очередь", True)):
+        result = asyncio.run(run(scheduled, args.users, args.replies, args.broadcast, args.rtt / 1000))
+        print(f"{name:<10}{result['p50']:10.1f}{result['p99']:10.1f}{result['lost']:10}{result['retry_after']:12}")
+
+
+if __name__ == "__main__":
+    main()
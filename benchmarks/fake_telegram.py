@@ -0,0 +1,137 @@
+"""Поддельный Bot API сервер для бенчмарков: отдаёт обновления и запоминает ответы бота.
+
+Бот направляется на него через TELEGRAM_API_URL. Обновления выдаются через
+getUpdates (long polling), ответы sendMessage/editMessageText/... фиксируются
+с временем прихода, чтобы измерить задержку от обновления до ответа.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+# Методы, которые в ответ возвращают сообщение
+MESSAGE_METHODS = {"sendMessage", "editMessageText", "sendDocument", "editMessageReplyMarkup"}
+
+
+def message_update(update_id: int, chat_id: int, text: str) -> dict:
+    """Обновление с текстовым сообщением от пользователя chat_id."""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id: int, chat_id: int, data: str) -> dict:
+    """Обновление с нажатием инлайн-кнопки под сообщением бота."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "menu",
+            },
+        },
+    }
+
+
+class FakeTelegram:
+    """Bot API на aiohttp: очередь обновлений и журнал вызовов бота."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081):
+        self.host = host
+        self.port = port
+        self.updates: List[dict] = []
+        self.calls: List[tuple] = []  # (время, метод, chat_id)
+        self.last_reply: Dict[int, dict] = {}  # chat_id -> параметры последнего сообщения бота
+        self.polled = asyncio.Event()  # Бот хотя бы раз вызвал getUpdates
+        self._new_updates = asyncio.Event()
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def push(self, update: dict):
+        """Кладёт обновление в очередь getUpdates."""
+        self.updates.append(update)
+        self._new_updates.set()
+
+    def expect_reply(self, chat_id: int) -> asyncio.Future:
+        """Future, которое завершится временем первого ответа бота в chat_id."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(chat_id, []).append(future)
+        return future
+
+    async def _get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        self.polled.set()
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self.updates)
+
+    def _record(self, method: str, params: dict):
+        chat_id = params.get("chat_id")
+        chat_id = int(chat_id) if chat_id not in (None, "") else None
+        now = time.perf_counter()
+        self.calls.append((now, method, chat_id))
+        for future in self._waiters.pop(chat_id, []):
+            if not future.done():
+                future.set_result(now)
+        return chat_id
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        params.update(request.query)
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": BOT_USER})
+        chat_id = self._record(method, params)
+        if method in MESSAGE_METHODS:
+            self.last_reply[chat_id] = params
+            self._message_id += 1
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id or 0, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+            return web.json_response({"ok": True, "result": result})
+        return web.json_response({"ok": True, "result": True})
+
+    async def start(self):
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
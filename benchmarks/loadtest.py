@@ -0,0 +1,281 @@
+"""Нагрузочный тест бота целиком: много пользователей, поддельные Telegram и сайт.
+
+Обновления подаются прямо в dp из main.py от множества одновременных
+пользователей: регистрация через /start, актуальные статьи, рубрики,
+поиск, листание списков и нажатия на кнопки статей. Ответы бота принимает поддельный Bot API
+(benchmarks/fake_telegram.py), страницы kadrovik.uz отдаёт локальный сервер
+из записанных фикстур (benchmarks/record_fixtures.py) с заданной задержкой.
+
+Скрипт выводит пропускную способность, задержку обработки обновлений
+(p50/p95/p99 по видам действий) и рост памяти процесса по ходу теста.
+Базы бота создаются во временном каталоге, кэши в начале пустые.
+
+Запуск из корня репозитория:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --users 500 --actions 20 --site-latency 200
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from benchmarks.bench_modes import free_port, percentile
+from benchmarks.fake_telegram import FakeTelegram, message_update, callback_update
+from benchmarks.record_fixtures import FIXTURES_DIR, MANIFEST
+
+TOKEN = "123456:loadtest"
+QUERIES = ["отпуск", "трудовой договор", "приказ", "больничный", "командировка", "стаж", "увольнение", "пособие"]
+# Доли действий пользователя после регистрации
+ACTIONS = {"latest": 4, "rubrika": 3, "search": 2, "start": 1}
+MORE_SHARE = 0.3  # Доля списков, которые листают кнопкой "Ещё"
+
+
+class FakeSite:
+    """Локальный kadrovik.uz: страницы из фикстур, задержка ответа latency ± jitter."""
+
+    def __init__(self, latency: float, jitter: float, host: str = "127.0.0.1", port: int = 8082):
+        self.latency = latency
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.requests = Counter()  # имя фикстуры -> число запросов
+        self._pages = {}  # путь?запрос -> имя фикстуры
+        self._html = {}
+        self._longreads = []
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def load(self):
+        path = os.path.join(FIXTURES_DIR, MANIFEST)
+        if not os.path.exists(path):
+            sys.exit(f"Нет фикстур в {FIXTURES_DIR}: запустите python -m benchmarks.record_fixtures")
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        for name, entry in manifest.items():
+            with open(os.path.join(FIXTURES_DIR, entry["file"]), encoding="utf-8") as f:
+                self._html[name] = f.read()
+            if "longread" in entry["kinds"]:
+                self._longreads.append(name)
+            else:
+                url = urlparse(entry["url"])
+                self._pages[url.path + (f"?{url.query}" if url.query else "")] = name
+
+    def _fixture(self, request: web.Request):
+        path = request.path
+        if path.endswith("/search"):
+            return "search_ru"
+        if path.startswith(("/publish/doc/", "/uz/publish/doc/")):
+            # Любая статья - одна из длинных статей, выбор устойчив для одного адреса
+            return self._longreads[sum(map(ord, path)) % len(self._longreads)]
+        return self._pages.get(request.path_qs) or self._pages.get(path)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+        name = self._fixture(request)
+        self.requests[name or "404"] += 1
+        if name is None:
+            return web.Response(status=404, text="Not found")
+        return web.Response(text=self._html[name], content_type="text/html", charset="utf-8")
+
+    async def start(self):
+        self.load()
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса, МБ (без /proc - пиковый)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def buttons(reply: dict) -> list:
+    """callback_data кнопок из ответа бота."""
+    markup = reply.get("reply_markup") if reply else None
+    if not markup:
+        return []
+    if isinstance(markup, str):
+        markup = json.loads(markup)
+    return [b["callback_data"] for row in markup.get("inline_keyboard", []) for b in row if b.get("callback_data")]
+
+
+class LoadTest:
+    def __init__(self, main, telegram: FakeTelegram, think: float):
+        self.main = main
+        self.telegram = telegram
+        self.think = think
+        self.update_ids = itertools.count(1)
+        self.latencies = defaultdict(list)  # действие -> задержки, мс
+        self.errors = Counter()
+        self.done = 0
+
+    async def send(self, action: str, chat_id: int, update: dict) -> dict:
+        """Подаёт обновление в dp и возвращает последний ответ бота в этом чате."""
+        self.telegram.last_reply.pop(chat_id, None)
+        start = time.perf_counter()
+        try:
+            await self.main.dp.feed_raw_update(self.main.bot, update)
+        except Exception as e:
+            self.errors[f"{action}: {type(e).__name__}"] += 1
+        self.latencies[action].append((time.perf_counter() - start) * 1000)
+        self.done += 1
+        if self.think:
+            await asyncio.sleep(random.uniform(0, 2 * self.think))
+        return self.telegram.last_reply.get(chat_id)
+
+    async def message(self, action: str, chat_id: int, text: str) -> dict:
+        return await self.send(action, chat_id, message_update(next(self.update_ids), chat_id, text))
+
+    async def tap(self, action: str, chat_id: int, data: str) -> dict:
+        return await self.send(action, chat_id, callback_update(next(self.update_ids), chat_id, data))
+
+    async def open_article(self, chat_id: int, reply: dict, rng: random.Random):
+        # Иногда пользователь листает список дальше кнопкой "Ещё"
+        more = [data for data in buttons(reply) if data.startswith("more:")]
+        if more and rng.random() < MORE_SHARE:
+            reply = await self.tap("more", chat_id, more[0])
+        articles = [data for data in buttons(reply) if data.startswith("art:")]
+        if articles:
+            await self.tap("article", chat_id, rng.choice(articles))
+
+    async def user(self, chat_id: int, actions: int, rng: random.Random):
+        await self.message("start", chat_id, "/start")
+        await self.message("name", chat_id, f"Пользователь {chat_id}")
+        await self.message("phone", chat_id, f"+99890{chat_id:07d}")
+        kinds, weights = zip(*ACTIONS.items())
+        for kind in rng.choices(kinds, weights, k=actions):
+            if kind == "latest":
+                await self.open_article(chat_id, await self.tap("latest", chat_id, "kadrovik_latest"), rng)
+            elif kind == "rubrika":
+                rubriki = [data for data in buttons(await self.tap("rubriki", chat_id, "kadrovik_news")) if data != "main_menu"]
+                if rubriki:
+                    await self.open_article(chat_id, await self.tap("rubrika", chat_id, rng.choice(rubriki)), rng)
+                    # Возврат в главное меню
+                    await self.tap("menu", chat_id, "main_menu")
+            elif kind == "search":
+                await self.tap("search", chat_id, "kadrovik_search")
+                await self.open_article(chat_id, await self.message("query", chat_id, rng.choice(QUERIES)), rng)
+            else:
+                await self.message("start", chat_id, "/start")
+
+
+async def sample_memory(test: LoadTest, started: float, interval: float, samples: list):
+    while True:
+        samples.append((time.perf_counter() - started, test.done, rss_mb()))
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> None:
+    telegram = FakeTelegram(port=free_port())
+    site = FakeSite(args.site_latency / 1000, args.site_jitter / 1000, port=free_port())
+    await telegram.start()
+    await site.start()
+
+    # Бот в этом же процессе: окружение и рабочий каталог задаются до импорта main
+    os.environ.update(BOT_TOKEN=TOKEN, TELEGRAM_API_URL=telegram.base_url, REFRESH_INTERVAL="0")
+    os.chdir(tempfile.mkdtemp(prefix="loadtest_"))
+    import main
+
+    from utils import http
+    from utils.send_queue import send_scheduler
+    from utils.workers import extraction_pool
+
+    http.SITE_MIRROR = site.base_url  # utils.http уже импортирован, переменная окружения опоздала бы
+    if not args.telegram_limits:
+        send_scheduler.configure(rate=1e6, burst=1e6, chat_rate=1e6, chat_burst=1e6)
+    extraction_pool.configure(workers=main.EXTRACT_WORKERS, mode=main.EXTRACT_MODE)
+    await http.init_http_session()
+    await main.dp.emit_startup(bot=main.bot, refresh=False)
+
+    test = LoadTest(main, telegram, args.think / 1000)
+    rng = random.Random(args.seed)
+    samples = []
+    started = time.perf_counter()
+    sampler = asyncio.create_task(sample_memory(test, started, args.sample, samples))
+    try:
+        await asyncio.gather(*(
+            test.user(100_000 + i, args.actions, random.Random(rng.random())) for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        sampler.cancel()
+        samples.append((time.perf_counter() - started, test.done, rss_mb()))
+        await main.dp.emit_shutdown(bot=main.bot)
+        await main.close_resources()
+        await site.stop()
+        await telegram.stop()
+
+    report(test, telegram, site, samples, elapsed, args.users)
+
+
+def report(test: LoadTest, telegram: FakeTelegram, site: FakeSite, samples: list, elapsed: float, users: int):
+    print(f"\nПользователей {users}, обновлений {test.done} за {elapsed:.1f} с: {test.done / elapsed:.1f} обн/с")
+    print(f"\n{'действие':<10}{'кол-во':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'макс':>9}   (задержка, мс)")
+    everything = []
+    for action, values in sorted(test.latencies.items(), key=lambda item: -len(item[1])):
+        everything.extend(values)
+        print(
+            f"{action:<10}{len(values):8}{percentile(values, 50):9.1f}{percentile(values, 95):9.1f}"
+            f"{percentile(values, 99):9.1f}{max(values):9.1f}"
+        )
+    print(
+        f"{'всего':<10}{len(everything):8}{percentile(everything, 50):9.1f}{percentile(everything, 95):9.1f}"
+        f"{percentile(everything, 99):9.1f}{max(everything):9.1f}"
+    )
+
+    print(f"\n{'время, с':>10}{'обновлений':>12}{'RSS, МБ':>10}")
+    step = max(1, len(samples) // 15)
+    for at, done, mb in samples[::step] + ([samples[-1]] if (len(samples) - 1) % step else []):
+        print(f"{at:10.1f}{done:12}{mb:10.1f}")
+    growth = samples[-1][2] - samples[0][2]
+    per_1000 = growth / test.done * 1000 if test.done else 0
+    print(f"Рост памяти: {growth:+.1f} МБ ({per_1000:+.2f} МБ на 1000 обновлений)")
+
+    methods = Counter(method for _, method, _ in telegram.calls)
+    print("\nВызовы Bot API: " + ", ".join(f"{method} {count}" for method, count in methods.most_common()))
+    print(f"Запросы к сайту: {sum(site.requests.values())} ({', '.join(f'{n} {c}' for n, c in site.requests.most_common())})")
+    if test.errors:
+        print("Ошибки: " + ", ".join(f"{error} {count}" for error, count in test.errors.most_common()))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=200, help="одновременных пользователей")
+    arg_parser.add_argument("--actions", type=int, default=10, help="действий каждого пользователя после регистрации")
+    arg_parser.add_argument("--think", type=float, default=0, help="средняя пауза пользователя между обновлениями, мс")
+    arg_parser.add_argument("--site-latency", type=float, default=100, help="задержка ответа сайта, мс")
+    arg_parser.add_argument("--site-jitter", type=float, default=50, help="разброс задержки сайта, ± мс")
+    arg_parser.add_argument("--sample", type=float, default=1, help="период замера памяти, с")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--telegram-limits", action="store_true",
+                            help="оставить лимиты отправки Telegram (иначе снимаются, чтобы мерить сам бот)")
+    args = arg_parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
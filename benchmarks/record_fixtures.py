@@ -0,0 +1,183 @@
+"""Запись HTML-фикстур kadrovik.uz для офлайн-бенчмарков парсеров.
+
+С сайта скачиваются главная (ru и uz), страница поиска, страницы рубрик и
+несколько длинных статей; файлы и manifest.json сохраняются в benchmarks/fixtures.
+Без доступа к сайту --synthetic пишет детерминированные страницы той же
+разметки, на которую рассчитаны парсеры.
+
+Запуск из корня репозитория:
+    python -m benchmarks.record_fixtures
+    python -m benchmarks.record_fixtures --synthetic
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from urllib.parse import quote_plus
+
+from utils.http import fetch_text, close_http_session
+from utils.parser import extract_articles
+from utils.parsing_rubriki import RUBRIKI
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST = "manifest.json"
+SEARCH_QUERY = "отпуск"
+LONGREADS = 3
+
+# Что проверять на каждой фикстуре
+PAGES = [
+    ("home_ru", "https://kadrovik.uz/", ["listing", "categories", "rubrika"]),
+    ("home_uz", "https://kadrovik.uz/uz/", ["listing"]),
+    ("search_ru", f"https://kadrovik.uz/search?q={quote_plus(SEARCH_QUERY)}", ["listing"]),
+] + [
+    (f"rubrika_{i}", url, ["rubrika"]) for i, url in enumerate(RUBRIKI.values()) if "/services" not in url
+]
+
+
+def save(manifest: dict, name: str, url: str, kinds: list, html: str):
+    filename = f"{name}.html"
+    with open(os.path.join(FIXTURES_DIR, filename), "w", encoding="utf-8") as f:
+        f.write(html)
+    manifest[name] = {"file": filename, "url": url, "kinds": kinds}
+    print(f"{name}: {len(html) // 1024} КБ  {url}")
+
+
+def write_manifest(manifest: dict):
+    with open(os.path.join(FIXTURES_DIR, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+async def record():
+    manifest = {}
+    try:
+        for name, url, kinds in PAGES:
+            save(manifest, name, url, kinds, await fetch_text(url, timeout=30))
+        # Длинные статьи берём из списка на главной
+        home = open(os.path.join(FIXTURES_DIR, manifest["home_ru"]["file"]), encoding="utf-8").read()
+        for i, article in enumerate(extract_articles(home, "https://kadrovik.uz/", LONGREADS)):
+            save(manifest, f"longread_{i}", article["url"], ["longread"], await fetch_text(article["url"], timeout=30))
+    finally:
+        await close_http_session()
+    write_manifest(manifest)
+
+
+# --- Синтетические страницы ---
+
+WORDS = (
+    "работодатель работник трудовой договор отпуск заработная плата приказ увольнение стаж пособие "
+    "кадровик табель учёт рабочего времени командировка дисциплинарное взыскание испытательный срок "
+    "совместительство больничный лист компенсация отпускные индексация штатное расписание должностная инструкция"
+).split()
+
+
+def sentence(rng: random.Random, low: int = 8, high: int = 20) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def page_shell(rng: random.Random, body: str) -> str:
+    """Тяжёлые <head>, меню и подвал, как на настоящих страницах."""
+    head = "".join(
+        f'<script>window.cfg{i}={{"id":{i},"v":"{rng.random():.6f}"}};</script>'
+        f'<link rel="stylesheet" href="/static/css/c{i}.css"><style>.b{i}{{margin:{i}px}}</style>'
+        for i in range(120)
+    )
+    nav = "".join(
+        f'<li class="menu__item"><a href="/publish/group{6000 + i}_{w}">{w.capitalize()}</a></li>'
+        for i, w in enumerate(WORDS)
+    )
+    nav += (
+        '<li><a href="/publish/group6600_konsultacii">Консультации</a></li>'
+        '<li><a href="/publish/group6601_novosti">Новости</a></li>'
+        '<li><a href="/publish/group6602_formy">Формы документов</a></li>'
+        '<li><a href="/publish/group6603_zakonodatelstvo">Законодательство</a></li>'
+    )
+    footer = "".join(f'<a href="/page/{i}">{rng.choice(WORDS)}</a>' for i in range(150))
+    return (
+        f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>Кадровик.uz</title>{head}</head>'
+        f'<body><header class="header"><nav><ul class="menu">{nav}</ul></nav></header>'
+        f'<main class="page">{body}</main><footer class="footer">{footer}</footer></body></html>'
+    )
+
+
+def post_cards(rng: random.Random, count: int, start: int, lang_prefix: str = "") -> str:
+    return "".join(
+        f'<li class="post-card-wrapper"><div class="post-card">'
+        f'<a href="{lang_prefix}/publish/doc/text{start + i}_{rng.choice(WORDS)}">'
+        f'<img src="/img/{start + i}.jpg" alt=""><h4 class="post-card__title">{sentence(rng, 6, 12)}</h4></a>'
+        f'<time class="longread-post__time-published" datetime="2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}">'
+        f'{rng.randint(1, 28)} мая</time><p class="post-card__lead">{sentence(rng)}</p></div></li>'
+        for i in range(count)
+    )
+
+
+def synthetic_home(rng: random.Random, lang_prefix: str = "") -> str:
+    blocks = "".join(
+        f'<section class="rubric-block"><div class="rubric-block__head"><h2>{title}</h2>'
+        f'<a href="/publish/group{7000 + i}_{rng.choice(WORDS)}">Смотреть все</a></div>'
+        f'<ul class="posts-list">{post_cards(rng, 6, 10000 + i * 10, lang_prefix)}</ul></section>'
+        for i, title in enumerate(["Новые публикации", "Лайфхаки кадровика", "Прием на работу", "Отпуска и отгулы"])
+    )
+    banners = "".join(f'<div class="banner"><p>{sentence(rng)}</p></div>' for i in range(40))
+    return page_shell(rng, (
+        f'{banners}<section class="posts-block"><h2>Актуальное</h2>'
+        f'<ul class="posts-list">{post_cards(rng, 20, 20000, lang_prefix)}</ul></section>{blocks}'
+    ))
+
+
+def synthetic_rubrika(rng: random.Random, page: int = 1) -> str:
+    items = "".join(
+        f'<div class="publication-item"><h3><a href="/publish/doc/text{30000 + page * 100 + i}_{rng.choice(WORDS)}">'
+        f'{sentence(rng, 6, 12)}</a></h3><div class="publication-item__date">12.05.2024</div>'
+        f'<p>{sentence(rng)} {sentence(rng)}</p></div>'
+        for i in range(20)
+    )
+    pagination = (
+        '<ul class="pagination">' + "".join(f'<li><a href="?PAGEN_1={p}">{p}</a></li>' for p in range(1, 6))
+        + f'<li><a rel="next" href="?PAGEN_1={page + 1}">»</a></li></ul>'
+    )
+    return page_shell(rng, f'<h1>Рубрика</h1><div class="publications">{items}</div>{pagination}')
+
+
+def synthetic_longread(rng: random.Random, paragraphs: int) -> str:
+    body = "".join(
+        f"<p><strong>{sentence(rng, 3, 6)}</strong></p>" if i % 12 == 0 else
+        f"<ul><li>{sentence(rng)}</li><li>{sentence(rng)}</li></ul>" if i % 12 == 6 else
+        f"<p>{sentence(rng)} {sentence(rng)} {sentence(rng)}</p>"
+        for i in range(paragraphs)
+    )
+    return page_shell(rng, (
+        f'<article class="longread-post"><h1>{sentence(rng, 5, 9)}</h1>'
+        f'<time class="longread-post__time-published" datetime="2024-05-01">1 мая 2024</time>'
+        f'<section class="longread-block">{body}</section></article>'
+    ))
+
+
+def synthetic():
+    rng = random.Random(2024)
+    manifest = {}
+    save(manifest, "home_ru", "https://kadrovik.uz/", ["listing", "categories", "rubrika"], synthetic_home(rng))
+    save(manifest, "home_uz", "https://kadrovik.uz/uz/", ["listing"], synthetic_home(rng, "/uz"))
+    search_url = f"https://kadrovik.uz/search?q={quote_plus(SEARCH_QUERY)}"
+    save(manifest, "search_ru", search_url, ["listing"], synthetic_home(rng))
+    for i, url in enumerate(url for url in RUBRIKI.values() if "/services" not in url):
+        save(manifest, f"rubrika_{i}", url, ["rubrika"], synthetic_rubrika(rng, i + 1))
+    for i, paragraphs in enumerate((150, 300, 600)):
+        url = f"https://kadrovik.uz/publish/doc/text{40000 + i}_longread"
+        save(manifest, f"longread_{i}", url, ["longread"], synthetic_longread(rng, paragraphs))
+    write_manifest(manifest)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--synthetic", action="store_true", help="сгенерировать страницы без доступа к сайту")
+    args = arg_parser.parse_args()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    if args.synthetic:
+        synthetic()
+    else:
+        asyncio.run(record())
+
+
+if __name__ == "__main__":
+    main()
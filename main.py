@@ -1,20 +1,41 @@
 import asyncio
 import logging
+import multiprocessing
 import os
+import signal
+import socket
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import BufferedInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from dotenv import load_dotenv
-import json
 from datetime import datetime
-from io import BytesIO
 
 # Импорт парсеров
-from utils.parser import get_latest_articles, search_articles, fetch_article_content
-from utils.parsing_rubriki import fetch_rubrika_articles, RUBRIKI
+from utils.parser import get_latest_articles, search_articles, fetch_article_content, fetch_articles_from_site, search_url
+from utils.parsing_rubriki import get_rubrika_articles, fetch_rubrika_articles, get_rubriki, find_rubrika, rubrika_id, fetch_categories, load_categories
+from utils.http import init_http_session, close_http_session
+from utils.storage import cache_store
+from utils.refresher import BackgroundRefresher
+from utils.search_index import search_index
+from utils.inline_search import inline_search, CACHE_TIME, LATEST_CACHE_TIME
+from utils.reader import reader_id, load_reader, save_reader
+from utils.file_ids import get_file_id, save_file_id, forget_file_id
+from utils.users import UserManager
+from utils.snapshots import snapshots
+from utils import listings
+from utils.workers import extraction_pool, DEFAULT_WORKERS
+from utils.fsm_storage import create_fsm_storage, FSM_DB, FSM_TTL
+from utils.send_queue import send_scheduler, GLOBAL_RATE, GLOBAL_BURST
+from utils.metrics import update_seconds, metrics_handler, start_metrics_server, enable_profiler, profile
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,36 +50,58 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN not found in .env file")
 
+# Хранилище FSM: Redis при заданном REDIS_URL, иначе общий для воркеров SQLite-файл
+REDIS_URL = os.getenv("REDIS_URL")
+FSM_PATH = os.getenv("FSM_DB", FSM_DB)
+FSM_STATE_TTL = int(os.getenv("FSM_TTL", str(FSM_TTL)))  # Срок жизни состояния без активности, сек (0 - бессрочно)
+
+# Режим получения обновлений: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный адрес бота, например https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))  # Процессов на одном слушающем сокете
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # Свой Bot API сервер вместо api.telegram.org
+SEND_LIMITS = os.getenv("SEND_LIMITS", "1") != "0"  # 0 - отправлять без лимитов Telegram (бенчмарки с поддельным API)
+
+# Метрики Prometheus и профилирование
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # /metrics на этом порту (воркер N - на METRICS_PORT + N), 0 - выключено
+PROFILE_SLOW_MS = int(os.getenv("PROFILE_SLOW_MS", "0"))  # Профилировать обновления дольше стольких мс, 0 - выключено
+
 # Инициализация бота
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session)
+# Все исходящие сообщения проходят через очередь с лимитами Telegram
+bot.session.middleware(send_scheduler)
+if not SEND_LIMITS:
+    send_scheduler.configure(rate=1e6, burst=1e6, chat_rate=1e6, chat_burst=1e6)
+elif BOT_MODE == "webhook" and WEB_WORKERS > 1:
+    # Очередь своя в каждом процессе, а лимит на бота общий: делим его между воркерами.
+    # Лимит на чат остаётся на процесс: если сообщения одного чата обрабатывают разные
+    # воркеры, Telegram может ответить RetryAfter, и очередь повторит отправку
+    send_scheduler.configure(rate=GLOBAL_RATE / WEB_WORKERS, burst=max(1.0, GLOBAL_BURST / WEB_WORKERS))
+dp = Dispatcher(storage=create_fsm_storage(REDIS_URL, FSM_PATH, FSM_STATE_TTL or None))
+if PROFILE_SLOW_MS:
+    enable_profiler(PROFILE_SLOW_MS / 1000)
+
+# Время обработки каждого обновления
+@dp.update.outer_middleware()
+async def measure_update(handler, event: types.Update, data: dict):
+    with update_seconds.time(type=event.event_type), profile(f"update {event.event_type} {event.update_id}"):
+        return await handler(event, data)
 
 # Константы
 MAX_ARTICLES = 5  # Максимальное количество статей для отображения
 MAX_MESSAGE_LENGTH = 4000  # Максимальная длина сообщения в Telegram
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", "1800"))  # Период фонового обновления списков, сек (0 - выключено)
+SEARCH_RELOAD_INTERVAL = int(os.getenv("SEARCH_RELOAD_INTERVAL", "300"))  # Как часто подхватывать статьи из индекса обходчика, сек (0 - выключено)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(DEFAULT_WORKERS)))  # Размер пула для разбора HTML
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "thread")  # thread или process
 
 # Менеджер пользователей
-class UserManager:
-    def __init__(self):
-        self.users = {}
-        self.load_users()
-
-    def load_users(self):
-        if os.path.exists("users.json"):
-            with open("users.json", "r") as f:
-                self.users = json.load(f)
-
-    def save_users(self):
-        with open("users.json", "w") as f:
-            json.dump(self.users, f, indent=4)
-
-    def add_user(self, user_id, name, phone):
-        self.users[user_id] = {"name": name, "phone": phone}
-        self.save_users()
-
-    def get_user(self, user_id):
-        return self.users.get(user_id)
-
 user_manager = UserManager()
 
 # Состояния FSM
@@ -69,12 +112,26 @@ class AuthStates(StatesGroup):
 class SearchStates(StatesGroup):
     WAITING_FOR_QUERY = State()
 
-class RubrikaStates(StatesGroup):
-    WAITING_FOR_RUBRIKA = State()
-    WAITING_FOR_ARTICLE = State()
+# --- Данные кнопок ---
+# callback_data вида "префикс:поле:поле" не зависит от процесса и состояния пользователя,
+# поэтому кнопки работают после перезапуска и на любом воркере
+class ArticleCallback(CallbackData, prefix="art"):
+    snapshot: str  # id снимка списка
+    index: int
+
+class ReaderPageCallback(CallbackData, prefix="read"):
+    rid: str
+    page: int
+
+class ReaderFileCallback(CallbackData, prefix="read_file"):
+    rid: str
+
+class RubrikaCallback(CallbackData, prefix="rub"):
+    id: str  # rubrika_id(название)
 
-# Глобальные переменные
-latest_articles = []
+class ListingCallback(CallbackData, prefix="more"):
+    listing: str  # listing_id рубрики или поискового запроса
+    offset: int  # Сколько статей уже показано
 
 # --- Клавиатуры ---
 def get_main_menu():
@@ -111,7 +168,7 @@ def get_main_menu():
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message, state: FSMContext):
     user_id = str(message.from_user.id)
-    user = user_manager.get_user(user_id)
+    user = await user_manager.get_user(user_id)
     
     if user:
         await message.answer(
@@ -132,91 +189,224 @@ async def process_name(message: types.Message, state: FSMContext):
 async def process_phone(message: types.Message, state: FSMContext):
     user_id = str(message.from_user.id)
     data = await state.get_data()
-    user_manager.add_user(user_id, data['name'], message.text)
+    await user_manager.add_user(user_id, data['name'], message.text)
     await message.answer(
         f"Регистрация завершена, {data['name']}!",
         reply_markup=get_main_menu()
     )
     await state.clear()
 
+def get_articles_keyboard(snapshot, back_callback=None, more=None, start=0):
+    """Кнопки статей снимка: callback_data содержит id снимка и номер статьи"""
+    builder = InlineKeyboardBuilder()
+    for i in range(len(snapshot)):
+        builder.add(types.InlineKeyboardButton(
+            text=f"Статья {start + i + 1}",
+            callback_data=ArticleCallback(snapshot=snapshot.id, index=i).pack()
+        ))
+    if more:
+        builder.add(types.InlineKeyboardButton(
+            text="Ещё ▶️",
+            callback_data=more.pack()
+        ))
+    if back_callback:
+        builder.add(types.InlineKeyboardButton(
+            text="Назад",
+            callback_data=back_callback
+        ))
+    builder.adjust(2)
+    return builder.as_markup()
+
+async def answer_listing(message: types.Message, lid: str, offset: int = 0):
+    """Показывает MAX_ARTICLES статей списка начиная с offset и кнопку "Ещё", если есть продолжение"""
+    page = await listings.get_page(lid, offset, MAX_ARTICLES)
+    if page is None:
+        await message.answer("Список устарел, откройте его заново")
+        return
+    if not page["articles"]:
+        await message.answer("Больше статей нет")
+        return
+
+    snapshot = await snapshots.publish(page["articles"])
+    articles_list = "\n".join(
+        f"{offset + i + 1}. {art.title}"
+        for i, art in enumerate(snapshot.articles)
+    )
+    more = ListingCallback(listing=lid, offset=offset + len(snapshot)) if page["has_more"] else None
+    back = "kadrovik_news" if page["kind"] == "rubrika" else None
+    await message.answer(
+        f"{page['title']}\n\n{articles_list}",
+        reply_markup=get_articles_keyboard(snapshot, back, more, offset)
+    )
+
 # --- Основные обработчики ---
-async def send_article_content(chat_id: int, article: dict):
-    """Отправляет содержимое статьи с обработкой длинных текстов"""
-    try:
-        content = await fetch_article_content(article['url'])
-        if not content:
-            await bot.send_message(chat_id, "Не удалось загрузить содержимое статьи")
+def get_reader_keyboard(rid: str, page: int, total: int):
+    """Кнопки листания статьи: назад / номер страницы / вперёд и отправка файлом"""
+    builder = InlineKeyboardBuilder()
+    nav = []
+    if page > 0:
+        nav.append(types.InlineKeyboardButton(text="◀️", callback_data=ReaderPageCallback(rid=rid, page=page - 1).pack()))
+    nav.append(types.InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data="noop"))
+    if page < total - 1:
+        nav.append(types.InlineKeyboardButton(text="▶️", callback_data=ReaderPageCallback(rid=rid, page=page + 1).pack()))
+    builder.row(*nav)
+    builder.row(types.InlineKeyboardButton(text="📄 Скачать файлом", callback_data=ReaderFileCallback(rid=rid).pack()))
+    return builder.as_markup()
+
+async def send_article_document(chat_id: int, reader: dict):
+    """Отправляет статью файлом; повторно используем file_id, пока текст не изменился"""
+    text = reader["text"]
+    # Хешируем только текст статьи: дата в заголовке у рубрик - время загрузки и меняется при каждом обновлении
+    body = text[reader.get("body_start", 0):]
+    file_id = await get_file_id(reader["url"], body)
+    if file_id:
+        try:
+            await bot.send_document(chat_id, file_id)
             return
+        except TelegramBadRequest as e:
+            logger.warning(f"file_id больше не действителен, загружаем заново: {e}")
+            await forget_file_id(reader["url"])
 
-        header = f"📰 {article['title']}\n📅 {article['date']}\n\n"
-        full_content = header + content
+    file = BufferedInputFile(text.encode('utf-8'), filename=f"{reader['title'][:50]}.txt")
+    message = await bot.send_document(chat_id, file)
+    await save_file_id(reader["url"], body, message.document.file_id)
 
-        if len(full_content) > MAX_MESSAGE_LENGTH:
-            # Отправляем файлом если текст слишком длинный
-            file = BytesIO(full_content.encode('utf-8'))
-            file.name = f"{article['title'][:50]}.txt"
-            await bot.send_document(chat_id, file)
+async def send_article_content(chat_id: int, article: dict):
+    """Отправляет содержимое статьи; длинные статьи открываются постранично"""
+    try:
+        rid = reader_id(article['url'])
+        reader = await load_reader(rid)
+        if reader is None:
+            content = await fetch_article_content(article['url'])
+            if not content:
+                await bot.send_message(chat_id, "Не удалось загрузить содержимое статьи")
+                return
+
+            header = f"📰 {article['title']}\n📅 {article['date']}\n\n"
+            full_content = header + content
+
+            if len(full_content) <= MAX_MESSAGE_LENGTH:
+                await bot.send_message(chat_id, full_content)
+                return
+            # Текст слишком длинный: режем на страницы один раз и кэшируем
+            reader = await save_reader(
+                article['url'], article['title'], full_content, MAX_MESSAGE_LENGTH, body_start=len(header)
+            )
+
+        pages = reader["pages"]
+        if len(pages) == 1:
+            await bot.send_message(chat_id, pages[0])
         else:
-            await bot.send_message(chat_id, full_content)
+            await bot.send_message(chat_id, pages[0], reply_markup=get_reader_keyboard(rid, 0, len(pages)))
+    except TelegramRetryAfter as e:
+        logger.warning(f"Telegram ограничил отправку в чат {chat_id} ещё на {e.retry_after} с")
     except Exception as e:
         logger.error(f"Ошибка при отправке статьи: {e}")
         await bot.send_message(chat_id, "Произошла ошибка при обработке статьи")
 
 # --- Обработчики callback ---
-@dp.callback_query(lambda c: c.data == "kadrovik_latest")
-async def handle_latest_articles(callback: types.CallbackQuery):
-    global latest_articles
-    latest_articles = await get_latest_articles("ru")  # Явно указываем язык
+# Таблица маршрутов: префикс callback_data -> (класс данных или None, обработчик).
+# Обработчик получает (callback, state, данные кнопки); поиск по словарю вместо перебора фильтров
+callback_routes = {}
+
+def callback_route(key):
+    """Регистрирует обработчик для точного значения callback_data или класса CallbackData"""
+    def decorator(handler):
+        if isinstance(key, str):
+            callback_routes[key] = (None, handler)
+        else:
+            callback_routes[key.__prefix__] = (key, handler)
+        return handler
+    return decorator
+
+@dp.callback_query()
+async def route_callback(callback: types.CallbackQuery, state: FSMContext):
+    prefix = (callback.data or "").split(":", 1)[0]
+    route = callback_routes.get(prefix)
+    if route is None:
+        await callback.answer("Кнопка устарела, откройте меню заново", show_alert=True)
+        return
+    data_class, handler = route
+    data = None
+    if data_class is not None:
+        try:
+            data = data_class.unpack(callback.data)
+        except (TypeError, ValueError):
+            await callback.answer("Ошибка: неверные данные кнопки")
+            return
+    await handler(callback, state, data)
+
+@callback_route("kadrovik_latest")
+async def handle_latest_articles(callback: types.CallbackQuery, state: FSMContext, data=None):
+    articles = await get_latest_articles("ru")  # Явно указываем язык
     
-    if not latest_articles:
+    if not articles:
         await callback.message.answer("Не удалось загрузить последние статьи")
         return
 
-    builder = InlineKeyboardBuilder()
-    for i in range(min(len(latest_articles), MAX_ARTICLES)):
-        builder.add(types.InlineKeyboardButton(
-            text=f"Статья {i+1}",
-            callback_data=f"article_{i}"
-        ))
-    builder.adjust(2)
-
+    # Список публикуется один раз в общем реестре, в кнопках - только id снимка
+    snapshot = await snapshots.publish(articles[:MAX_ARTICLES])
     articles_list = "\n".join(
-        f"{i+1}. {art['title']}" 
-        for i, art in enumerate(latest_articles[:MAX_ARTICLES])
+        f"{i+1}. {art.title}" 
+        for i, art in enumerate(snapshot.articles)
     )
     await callback.message.answer(
         f"📰 Последние статьи:\n\n{articles_list}",
-        reply_markup=builder.as_markup()
+        reply_markup=get_articles_keyboard(snapshot)
     )
 
-@dp.callback_query(lambda c: c.data.startswith("article_"))
-async def handle_article(callback: types.CallbackQuery):
-    try:
-        idx = int(callback.data.split("_")[1])
-        if 0 <= idx < len(latest_articles):
-            await send_article_content(callback.from_user.id, latest_articles[idx])
-        else:
-            await callback.message.answer("Статья не найдена")
-    except (IndexError, ValueError):
-        await callback.message.answer("Ошибка: неверный идентификатор статьи")
+@callback_route(ArticleCallback)
+async def handle_article(callback: types.CallbackQuery, state: FSMContext, data: ArticleCallback):
+    snapshot = await snapshots.get(data.snapshot)
+    if snapshot is None or not 0 <= data.index < len(snapshot):
+        await callback.message.answer("Статья не найдена")
+        return
+    await send_article_content(callback.from_user.id, snapshot[data.index].to_dict())
+
+@callback_route(ReaderPageCallback)
+async def handle_reader_page(callback: types.CallbackQuery, state: FSMContext, data: ReaderPageCallback):
+    """Листание статьи: одно чтение из кэша и одно редактирование сообщения"""
+    reader = await load_reader(data.rid)
+    if reader is None:
+        await callback.answer("Статья устарела, откройте её заново", show_alert=True)
+        return
+
+    pages = reader["pages"]
+    if not 0 <= data.page < len(pages):
+        await callback.answer()
+        return
+    await callback.message.edit_text(
+        pages[data.page], reply_markup=get_reader_keyboard(data.rid, data.page, len(pages))
+    )
+    await callback.answer()
 
-@dp.callback_query(lambda c: c.data == "kadrovik_search")
-async def handle_search(callback: types.CallbackQuery, state: FSMContext):
+@callback_route(ReaderFileCallback)
+async def handle_reader_file(callback: types.CallbackQuery, state: FSMContext, data: ReaderFileCallback):
+    reader = await load_reader(data.rid)
+    if reader is None:
+        await callback.answer("Статья устарела, откройте её заново", show_alert=True)
+        return
+    await send_article_document(callback.from_user.id, reader)
+    await callback.answer()
+
+@callback_route("noop")
+async def handle_noop(callback: types.CallbackQuery, state: FSMContext, data=None):
+    await callback.answer()
+
+@callback_route("kadrovik_search")
+async def handle_search(callback: types.CallbackQuery, state: FSMContext, data=None):
     await callback.message.answer("Введите поисковый запрос:")
     await state.set_state(SearchStates.WAITING_FOR_QUERY)
 
-@dp.callback_query(lambda c: c.data == "kadrovik_news")
-async def handle_rubriki(callback: types.CallbackQuery, state: FSMContext):
+@callback_route("kadrovik_news")
+async def handle_rubriki(callback: types.CallbackQuery, state: FSMContext, data=None):
     builder = InlineKeyboardBuilder()
     
-    # Создаем кнопки для рубрик с безопасными callback_data
-    rubrika_ids = {name: f"rub_{hash(name) % 1000:03d}" for name in RUBRIKI}
-    await state.update_data(rubrika_ids=rubrika_ids)
-    
-    for name, rub_id in rubrika_ids.items():
+    # id рубрики стабилен, поэтому хранить соответствие в состоянии пользователя не нужно
+    for name in await get_rubriki():
         builder.add(types.InlineKeyboardButton(
             text=name,
-            callback_data=rub_id
+            callback_data=RubrikaCallback(id=rubrika_id(name)).pack()
         ))
     
     builder.add(types.InlineKeyboardButton(
@@ -226,7 +416,7 @@ async def handle_rubriki(callback: types.CallbackQuery, state: FSMContext):
     
     builder.add(types.InlineKeyboardButton(
         text="Назад",
-        callback_data="main_menu"
+        callback_data="main_menu"  # Возврат в главное меню
     ))
     
     builder.adjust(1)
@@ -234,129 +424,31 @@ async def handle_rubriki(callback: types.CallbackQuery, state: FSMContext):
         "Выберите рубрику:",
         reply_markup=builder.as_markup()
     )
-    await state.set_state(RubrikaStates.WAITING_FOR_RUBRIKA)
 
-@dp.callback_query(RubrikaStates.WAITING_FOR_RUBRIKA)
-async def handle_rubrika_select(callback: types.CallbackQuery, state: FSMContext):
-    if callback.data == "main_menu":  # Обработка кнопки "Назад"
-        await handle_main_menu(callback, state)
-        return
-    
-    data = await state.get_data()
-    rubrika_ids = data.get("rubrika_ids", {})
-    
-    # Находим название рубрики по ID
-    rubrika_name = next((name for name, rub_id in rubrika_ids.items() 
-                        if rub_id == callback.data), None)
-    
-    if not rubrika_name or rubrika_name not in RUBRIKI:
+@callback_route(RubrikaCallback)
+async def handle_rubrika_select(callback: types.CallbackQuery, state: FSMContext, data: RubrikaCallback):
+    rubrika = await find_rubrika(data.id)
+    if rubrika is None:
         await callback.message.answer("Рубрика не найдена")
         return
+    rubrika_name, rubrika_url = rubrika
     
-    articles = await fetch_rubrika_articles(RUBRIKI[rubrika_name])
+    articles = await get_rubrika_articles(rubrika_url)
     if not articles:
         await callback.message.answer("В этой рубрике пока нет статей")
         return
     
-    # Сохраняем статьи в состоянии
-    await state.update_data(current_articles=articles)
-    
-    builder = InlineKeyboardBuilder()
-    for i in range(min(len(articles), MAX_ARTICLES)):
-        builder.add(types.InlineKeyboardButton(
-            text=f"Статья {i+1}",
-            callback_data=f"rub_art_{i}"
-        ))
-    
-    builder.add(types.InlineKeyboardButton(
-        text="Назад",
-        callback_data="kadrovik_news"  # Изменено для возврата в меню рубрик
-    ))
-    builder.adjust(2)
-    
-    articles_list = "\n".join(
-        f"{i+1}. {art['title']}" 
-        for i, art in enumerate(articles[:MAX_ARTICLES])
-    )
-    await callback.message.answer(
-        f"📚 Рубрика: {rubrika_name}\n\n{articles_list}",
-        reply_markup=builder.as_markup()
-    )
-    await state.set_state(RubrikaStates.WAITING_FOR_ARTICLE)
-
-@dp.callback_query(RubrikaStates.WAITING_FOR_ARTICLE)
-async def handle_rubrika_article(callback: types.CallbackQuery, state: FSMContext):
-    if callback.data == "kadrovik_news":  # Обработка кнопки "Назад"
-        await handle_rubriki(callback, state)
-        return
-    
-    try:
-        data = await state.get_data()
-        articles = data.get("current_articles", [])
-        
-        if callback.data.startswith("rub_art_"):
-            idx = int(callback.data.split("_")[2])
-            if 0 <= idx < len(articles):
-                await send_article_content(callback.from_user.id, articles[idx])
-            else:
-                await callback.message.answer("Статья не найдена")
-    except Exception as e:
-        logger.error(f"Ошибка обработки статьи из рубрики: {e}")
-        await callback.message.answer("Произошла ошибка при загрузке статьи")
-
-@dp.callback_query(lambda c: c.data == "kadrovik_news")
-async def handle_rubriki(callback: types.CallbackQuery, state: FSMContext):
-    builder = InlineKeyboardBuilder()
-    
-    # Создаем кнопки для рубрик с безопасными callback_data
-    rubrika_ids = {name: f"rub_{hash(name) % 1000:03d}" for name in RUBRIKI}
-    await state.update_data(rubrika_ids=rubrika_ids)
-    
-    for name, rub_id in rubrika_ids.items():
-        builder.add(types.InlineKeyboardButton(
-            text=name,
-            callback_data=rub_id
-        ))
-    
-    builder.add(types.InlineKeyboardButton(
-        text="Калькулятор отпускных",
-        url="https://kadrovik.uz/publish/doc/text199228_kalkulyator_otpusknyh"
-    ))
-    
-    builder.add(types.InlineKeyboardButton(
-        text="Назад",
-        callback_data="main_menu"  # Возврат в главное меню
-    ))
-    
-    builder.adjust(1)
-    await callback.message.answer(
-        "Выберите рубрику:",
-        reply_markup=builder.as_markup()
-    )
-    await state.set_state(RubrikaStates.WAITING_FOR_RUBRIKA)
+    # Следующие страницы рубрики догружаются кнопкой "Ещё"
+    lid = await listings.open_listing("rubrika", rubrika_url, f"📚 Рубрика: {rubrika_name}", articles)
+    await answer_listing(callback.message, lid)
 
-@dp.callback_query(RubrikaStates.WAITING_FOR_ARTICLE)
-async def handle_rubrika_article(callback: types.CallbackQuery, state: FSMContext):
-    if callback.data == "kadrovik_news":
-        await handle_rubriki(callback, state)
-        return
-    
-    try:
-        data = await state.get_data()
-        articles = data.get("current_articles", [])
-        
-        if callback.data.startswith("rub_art_"):
-            idx = int(callback.data.split("_")[2])
-            if 0 <= idx < len(articles):
-                await send_article_content(callback.from_user.id, articles[idx])
-            else:
-                await callback.message.answer("Статья не найдена")
-    except Exception as e:
-        logger.error(f"Ошибка обработки статьи из рубрики: {e}")
-        await callback.message.answer("Произошла ошибка при загрузке статьи")
+@callback_route(ListingCallback)
+async def handle_listing_more(callback: types.CallbackQuery, state: FSMContext, data: ListingCallback):
+    await answer_listing(callback.message, data.listing, data.offset)
+    await callback.answer()
 
-@dp.callback_query(lambda c: c.data == "help")
-async def handle_help(callback: types.CallbackQuery):
+@callback_route("help")
+async def handle_help(callback: types.CallbackQuery, state: FSMContext, data=None):
     await callback.message.answer(
         "ℹ️ Помощь:\n\n"
         "• Используйте кнопки меню для навигации\n"
@@ -364,8 +456,8 @@ async def handle_help(callback: types.CallbackQuery):
         "• Выберите рубрику для просмотра тематических статей"
     )
 
-@dp.callback_query(lambda c: c.data == "about")
-async def handle_about(callback: types.CallbackQuery):
+@callback_route("about")
+async def handle_about(callback: types.CallbackQuery, state: FSMContext, data=None):
     await callback.message.answer(
         "🤖 О боте:\n\n"
         "Этот бот помогает работать с материалами сайта Kadrovik.uz\n"
@@ -373,8 +465,8 @@ async def handle_about(callback: types.CallbackQuery):
         "Разработчик: Ваша компания"
     )
 
-@dp.callback_query(lambda c: c.data == "main_menu")
-async def handle_main_menu(callback: types.CallbackQuery, state: FSMContext):
+@callback_route("main_menu")
+async def handle_main_menu(callback: types.CallbackQuery, state: FSMContext, data=None):
     await state.clear()
     await callback.message.answer(
         "Главное меню:",
@@ -395,41 +487,193 @@ async def process_search(message: types.Message, state: FSMContext):
         await state.clear()
         return
     
-    # Сохраняем результаты поиска
-    await state.update_data(search_results=articles)
-    
-    builder = InlineKeyboardBuilder()
-    for i in range(min(len(articles), MAX_ARTICLES)):
-        builder.add(types.InlineKeyboardButton(
-            text=f"Статья {i+1}",
-            callback_data=f"search_art_{i}"
-        ))
-    builder.adjust(2)
-    
-    articles_list = "\n".join(
-        f"{i+1}. {art['title']}" 
-        for i, art in enumerate(articles[:MAX_ARTICLES])
-    )
-    await message.answer(
-        f"🔍 Результаты поиска по запросу '{query}':\n\n{articles_list}",
-        reply_markup=builder.as_markup()
+    lid = await listings.open_listing(
+        "search", search_url(query, "ru"), f"🔍 Результаты поиска по запросу '{query}':", articles
     )
+    await answer_listing(message, lid)
     await state.clear()
 
+# Инлайн-режим (@бот запрос): ответ только из локального индекса, без запросов к сайту.
+# Включается у @BotFather командой /setinline
+@dp.inline_query()
+async def handle_inline_query(inline_query: types.InlineQuery):
+    lang = "uz" if (inline_query.from_user.language_code or "").startswith("uz") else "ru"
+    articles = await inline_search.lookup(inline_query.query, lang, inline_query.from_user.id, inline_query.id)
+    if articles is None:
+        return  # Пользователь уже набрал следующий запрос
+    results = [
+        types.InlineQueryResultArticle(
+            id=reader_id(article["url"]),
+            title=article["title"],
+            description="\n".join(part for part in (article["date"], article["snippet"]) if part),
+            url=article["url"],
+            input_message_content=types.InputTextMessageContent(
+                message_text=f"📰 {article['title']}\n📅 {article['date']}\n\n{article['url']}"
+            ),
+        )
+        for article in articles
+    ]
+    # Поиск идёт по всему индексу и одинаков для всех; свежие статьи на пустой запрос
+    # зависят от языка пользователя, поэтому Telegram не должен отдавать их другим
+    searching = bool(inline_query.query.strip())
+    try:
+        await inline_query.answer(
+            results,
+            cache_time=CACHE_TIME if searching else LATEST_CACHE_TIME,
+            is_personal=not searching,
+        )
+    except TelegramBadRequest as e:
+        # Запрос устарел, пока искали: Telegram его уже не ждёт
+        logger.warning(f"Инлайн-ответ не отправлен: {e}")
+
 # Проверка авторизации для всех сообщений
 @dp.message()
 async def check_auth(message: types.Message):
-    if not user_manager.get_user(str(message.from_user.id)):
+    if not await user_manager.get_user(str(message.from_user.id)):
         await message.answer("Пожалуйста, зарегистрируйтесь через /start")
 
-# Запуск бота
-async def main():
+# Фоновое обновление разделов, актуальных статей и рубрик
+async def build_refresh_jobs():
+    jobs = {
+        "categories": fetch_categories,
+        "latest_ru": lambda: fetch_articles_from_site(lang="ru"),
+        "latest_uz": lambda: fetch_articles_from_site(lang="uz"),
+    }
+    # Те же рубрики, что в меню; несколько названий могут вести на один адрес
+    urls = {}
+    for name, url in (await get_rubriki()).items():
+        urls.setdefault(url, name)
+    for url, name in urls.items():
+        jobs[f"rubrika {name}"] = lambda url=url: fetch_rubrika_articles(url)
+    return jobs
+
+refresher = BackgroundRefresher(build_refresh_jobs, REFRESH_INTERVAL)
+
+@dp.startup()
+async def on_startup(refresh: bool = True):
+    await search_index.load()
+    # Обходчик (python -m utils.crawler) пишет в тот же индекс из другого процесса
+    search_index.start_reload(SEARCH_RELOAD_INTERVAL)
+    await load_categories()
+    # При нескольких воркерах фоновое обновление запускает только первый
+    if refresh:
+        refresher.start()
+
+@dp.shutdown()
+async def on_shutdown():
+    await refresher.stop()
+    search_index.close()
+
+async def close_resources():
+    await close_http_session()
+    extraction_pool.shutdown()
+    cache_store.close()
+    user_manager.close()
+    await bot.session.close()
+
+async def start_metrics(worker=0):
+    if not METRICS_PORT:
+        return None
+    runner = await start_metrics_server(METRICS_HOST, METRICS_PORT + worker)
+    logger.info(f"Метрики: http://{METRICS_HOST}:{METRICS_PORT + worker}/metrics")
+    return runner
+
+# Запуск бота: long polling
+async def run_polling():
+    extraction_pool.configure(workers=EXTRACT_WORKERS, mode=EXTRACT_MODE)
+    await init_http_session()
+    metrics_runner = await start_metrics()
     try:
-        await dp.start_polling(bot)
+        await bot.delete_webhook()
+        await dp.start_polling(bot, refresh=True)
     except Exception as e:
         logger.error(f"Ошибка в основном цикле: {e}")
+    finally:
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await close_resources()
+
+# Запуск бота: webhook на aiohttp
+async def set_webhook():
+    try:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook установлен: {WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH}")
     finally:
         await bot.session.close()
 
+def bind_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((WEBHOOK_HOST, WEBHOOK_PORT))
+    sock.listen(1024)
+    return sock
+
+async def run_webhook(sock, worker=0):
+    extraction_pool.configure(workers=EXTRACT_WORKERS, mode=EXTRACT_MODE)
+    await init_http_session()
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/metrics", metrics_handler)
+    setup_application(app, dp, bot=bot, refresh=worker == 0)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    metrics_runner = await start_metrics(worker)
+    try:
+        await web.SockSite(runner, sock).start()
+        logger.info(f"Воркер {os.getpid()} принимает обновления на {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        stopped = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        await stopped.wait()
+    finally:
+        await runner.cleanup()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await close_resources()
+
+def webhook_worker(sock, worker=0):
+    try:
+        asyncio.run(run_webhook(sock, worker))
+    except KeyboardInterrupt:
+        pass
+
+def serve_webhook():
+    sock = bind_socket()
+    if WEBHOOK_URL:
+        asyncio.run(set_webhook())
+    if WEB_WORKERS <= 1:
+        webhook_worker(sock)
+        return
+    # Все воркеры принимают соединения с одного сокета, открытого здесь
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=webhook_worker, args=(sock, i)) for i in range(WEB_WORKERS)]
+    for worker in workers:
+        worker.start()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Воркеры по SIGTERM дообрабатывают текущие обновления и закрывают ресурсы
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(timeout=15)
+            if worker.is_alive():
+                worker.kill()
+    finally:
+        sock.close()
+
+def main():
+    if BOT_MODE == "webhook":
+        serve_webhook()
+    elif BOT_MODE == "polling":
+        asyncio.run(run_polling())
+    else:
+        raise ValueError(f"Неизвестный BOT_MODE: {BOT_MODE}")
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
\ No newline at end of file
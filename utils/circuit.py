@@ -0,0 +1,81 @@
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+FAILURE_THRESHOLD = 5  # Столько ошибок подряд размыкают цепь
+RESET_TIMEOUT = 30  # Через сколько секунд после размыкания пробуем сайт снова
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Сайт недоступен: цепь разомкнута, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """Предохранитель для одного хоста.
+
+    closed - запросы идут как обычно; после failure_threshold ошибок подряд
+    цепь размыкается (open) и запросы сразу завершаются CircuitOpenError.
+    Через reset_timeout цепь полуоткрыта (half_open): пропускается один
+    пробный запрос, успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Запросы сейчас не пропускаются."""
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at < self.reset_timeout
+        if self.state == HALF_OPEN:
+            return self._probe_at is not None and time.monotonic() - self._probe_at < self.reset_timeout
+        return False
+
+    def before_request(self):
+        """Пропускает запрос или сразу бросает CircuitOpenError."""
+        if self.state == CLOSED:
+            return
+        if self.is_open:
+            raise CircuitOpenError(f"{self.name} недоступен, повтор не раньше чем через {self.reset_timeout} с")
+        # Пробный запрос; если он завис, через reset_timeout разрешается следующий
+        self.state = HALF_OPEN
+        self._probe_at = time.monotonic()
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"{datetime.now()}: {self.name} снова отвечает, цепь замкнута")
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"{datetime.now()}: {self.name} не отвечает ({self.failures} ошибок), цепь разомкнута")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    """Предохранитель хоста, к которому относится url."""
+    host = urlparse(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Callable
+
+from utils.http import fetch_conditional
+from utils.search_index import search_index
+from utils.storage import CacheStore
+from utils.workers import extraction_pool
+
+CONTENT_CACHE_DB = "content_cache.db"
+CONTENT_TTL = 60 * 60  # Сколько текст статьи считается свежим без перепроверки, сек
+CONTENT_CACHE_MAX_ENTRIES = 5000  # Сверх этого удаляются самые старые статьи
+
+content_store = CacheStore(CONTENT_CACHE_DB, max_entries=CONTENT_CACHE_MAX_ENTRIES)
+
+
+async def get_article_content(url: str, extract: Callable[[str], str], prefix: str = "", timeout: float = 15) -> str:
+    """Текст статьи по URL из кэша; после CONTENT_TTL перепроверяется условным GET.
+
+    Если сайт ответил 304, страница не скачивается и не разбирается повторно.
+    Если сайт недоступен, отдаётся последний сохранённый текст.
+    prefix разделяет записи разных функций извлечения для одного URL.
+    """
+    key = f"{prefix}{url}"
+    entry = await content_store.get(key, allow_stale=True)
+    if entry and not entry["expired"]:
+        return entry["data"]["text"]
+
+    cached = entry["data"] if entry else {}
+    try:
+        html, etag, last_modified = await fetch_conditional(
+            url, cached.get("etag"), cached.get("last_modified"), timeout=timeout
+        )
+    except Exception as e:
+        if not cached:
+            raise
+        print(f"{datetime.now()}: {url} недоступен ({e}), отдаём сохранённый текст")
+        return cached["text"]
+    if html is None:
+        text = cached["text"]
+    else:
+        text = await extraction_pool.run(extract, html)
+        await search_index.add(url, text=text)
+    await content_store.set(key, {"text": text, "etag": etag, "last_modified": last_modified}, ttl=CONTENT_TTL)
+    return text
@@ -0,0 +1,240 @@
+"""Фоновый обход рубрик kadrovik.uz.
+
+Обходит все рубрики из get_all_categories() с пагинацией, заранее загружает
+статьи в кэш содержимого и наполняет поисковый индекс. Очередь обхода хранится
+в SQLite, поэтому после перезапуска уже загруженные статьи не запрашиваются;
+страницы рубрик при каждом запуске обходятся заново, чтобы найти новые статьи.
+Работающий бот подхватывает новые статьи индекса раз в SEARCH_RELOAD_INTERVAL.
+
+Запуск отдельно от бота:
+    python -m utils.crawler --concurrency 4 --rate 2 --max-pages 5
+"""
+import argparse
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+from utils.circuit import CircuitOpenError, breaker_for, RESET_TIMEOUT
+from utils.content_cache import get_article_content
+from utils.http import fetch_text, init_http_session, close_http_session
+from utils.parser import extract_article_content
+from utils.parsing_rubriki import get_all_categories, extract_rubrika_page
+from utils.search_index import search_index
+from utils.storage import SQLiteDB
+from utils.workers import extraction_pool
+
+logger = logging.getLogger(__name__)
+
+CRAWLER_DB = "crawler.db"
+MAX_ATTEMPTS = 3  # После стольких ошибок адрес больше не запрашивается
+BATCH_SIZE = 100
+
+
+class Frontier:
+    """Очередь адресов для обхода в SQLite: pending -> done/failed."""
+
+    def __init__(self, path: str = CRAWLER_DB):
+        self.path = path
+        self._db = SQLiteDB(path, [
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "url TEXT PRIMARY KEY, "
+            "kind TEXT NOT NULL, "  # category или article
+            "page INTEGER NOT NULL DEFAULT 1, "
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status)",
+        ])
+
+    @staticmethod
+    def _add(conn: sqlite3.Connection, items: List[Tuple[str, str, int]]):
+        conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, kind, page, updated_at) VALUES (?, ?, ?, ?)",
+            [(url, kind, page, time.time()) for url, kind, page in items],
+        )
+        conn.commit()
+
+    @staticmethod
+    def _pending(conn: sqlite3.Connection, limit: int) -> List[Tuple[str, str, int]]:
+        return conn.execute(
+            "SELECT url, kind, page FROM frontier WHERE status = 'pending' "
+            "ORDER BY kind = 'article', updated_at LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    @staticmethod
+    def _mark(conn: sqlite3.Connection, url: str, ok: bool):
+        if ok:
+            conn.execute("UPDATE frontier SET status = 'done', updated_at = ? WHERE url = ?", (time.time(), url))
+        else:
+            conn.execute(
+                "UPDATE frontier SET attempts = attempts + 1, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END WHERE url = ?",
+                (time.time(), MAX_ATTEMPTS, url),
+            )
+        conn.commit()
+
+    @staticmethod
+    def _requeue(conn: sqlite3.Connection, kind: str):
+        conn.execute(
+            "UPDATE frontier SET status = 'pending', attempts = 0, updated_at = ? WHERE kind = ?",
+            (time.time(), kind),
+        )
+        conn.commit()
+
+    @staticmethod
+    def _reset(conn: sqlite3.Connection):
+        conn.execute("DELETE FROM frontier")
+        conn.commit()
+
+    async def add(self, items: List[Tuple[str, str, int]]):
+        if items:
+            await self._db.run(self._add, items)
+
+    async def pending(self, limit: int = BATCH_SIZE) -> List[Tuple[str, str, int]]:
+        return await self._db.run(self._pending, limit)
+
+    async def mark(self, url: str, ok: bool):
+        await self._db.run(self._mark, url, ok)
+
+    async def requeue(self, kind: str):
+        """Возвращает в очередь все адреса вида kind, в том числе уже обойдённые."""
+        await self._db.run(self._requeue, kind)
+
+    async def reset(self):
+        await self._db.run(self._reset)
+
+    def close(self):
+        self._db.close()
+
+
+class HostRateLimiter:
+    """Не чаще rate запросов в секунду к одному хосту."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_at = {}
+        self._locks = {}
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._next_at.get(host, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_at[host] = time.monotonic() + self.interval
+
+
+class Crawler:
+    """Обходит рубрики и статьи с общим лимитом параллельности и лимитом частоты на хост."""
+
+    def __init__(self, frontier: Frontier, concurrency: int = 4, rate: float = 2, max_pages: int = 5):
+        self.frontier = frontier
+        self.max_pages = max_pages
+        self._slots = asyncio.Semaphore(concurrency)
+        self._limiter = HostRateLimiter(rate)
+        self.stats = {"category": 0, "article": 0, "failed": 0}
+        self._blocked = False  # В пакете были адреса недоступного хоста
+
+    async def seed(self):
+        """Ставит в очередь первые страницы всех рубрик и заново - уже обойдённые страницы рубрик.
+
+        Статьи, которые уже загружены, остаются обойдёнными: повторный запуск
+        запрашивает только списки и новые статьи.
+        """
+        categories = await get_all_categories()
+        await self.frontier.requeue("category")
+        await self.frontier.add([(url, "category", 1) for url in categories.values()])
+
+    async def _crawl_category(self, url: str, page: int):
+        await self._limiter.wait(url)
+        html = await fetch_text(url, timeout=15)
+        result = await extraction_pool.run(extract_rubrika_page, html, url)
+        articles = result["articles"]
+        await search_index.add_articles(articles, "ru")
+        items = [(article["url"], "article", 0) for article in articles]
+        if result["next_url"] and page < self.max_pages:
+            items.append((result["next_url"], "category", page + 1))
+        await self.frontier.add(items)
+
+    async def _crawl_article(self, url: str):
+        await self._limiter.wait(url)
+        # Через кэш содержимого: текст сохраняется для бота и попадает в индекс.
+        # Ошибки загрузки не глушатся, чтобы _process отличал недоступный сайт
+        await get_article_content(url, extract_article_content, timeout=15)
+
+    async def _process(self, url: str, kind: str, page: int):
+        async with self._slots:
+            # Пока сайт недоступен, адрес остаётся в очереди и попытки не тратятся
+            if breaker_for(url).is_open:
+                self._blocked = True
+                return
+            try:
+                if kind == "category":
+                    await self._crawl_category(url, page)
+                else:
+                    await self._crawl_article(url)
+                self.stats[kind] += 1
+                await self.frontier.mark(url, ok=True)
+            except CircuitOpenError:
+                # Цепь разомкнулась, пока запрос ждал лимита частоты
+                self._blocked = True
+            except Exception as e:
+                logger.warning(f"Ошибка обхода {url}: {e}")
+                if breaker_for(url).is_open:
+                    # Эта ошибка разомкнула цепь: сайт лежит, а не статья битая
+                    self._blocked = True
+                    return
+                self.stats["failed"] += 1
+                await self.frontier.mark(url, ok=False)
+
+    async def run(self):
+        """Обходит очередь, пока в ней есть необработанные адреса."""
+        await self.seed()
+        while True:
+            batch = await self.frontier.pending()
+            if not batch:
+                break
+            self._blocked = False
+            await asyncio.gather(*(self._process(url, kind, page) for url, kind, page in batch))
+            logger.info(f"Обход: {self.stats}")
+            if self._blocked:
+                logger.warning(f"Сайт недоступен, пауза {RESET_TIMEOUT} с")
+                await asyncio.sleep(RESET_TIMEOUT)
+        return self.stats
+
+
+async def crawl(concurrency: int = 4, rate: float = 2, max_pages: int = 5, reset: bool = False):
+    frontier = Frontier()
+    if reset:
+        await frontier.reset()
+    await init_http_session()
+    await search_index.load()
+    try:
+        return await Crawler(frontier, concurrency, rate, max_pages).run()
+    finally:
+        await close_http_session()
+        extraction_pool.shutdown()
+        search_index.close()
+        frontier.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Обход рубрик kadrovik.uz")
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="одновременных запросов всего")
+    arg_parser.add_argument("--rate", type=float, default=2, help="запросов в секунду на хост")
+    arg_parser.add_argument("--max-pages", type=int, default=5, help="страниц пагинации на рубрику")
+    arg_parser.add_argument("--reset", action="store_true", help="начать обход заново")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    stats = asyncio.run(crawl(args.concurrency, args.rate, args.max_pages, args.reset))
+    print(f"Готово: {stats}")
+
+
+if __name__ == "__main__":
+    main()
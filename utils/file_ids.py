@@ -0,0 +1,23 @@
+from typing import Optional
+
+from utils.ids import content_hash
+from utils.storage import cache_store
+
+FILE_ID_TTL = 30 * 24 * 60 * 60  # Telegram хранит загруженные файлы долго; перепроверяем раз в месяц
+
+
+async def get_file_id(url: str, text: str) -> Optional[str]:
+    """file_id ранее загруженного документа, если текст статьи не изменился."""
+    entry = await cache_store.get(f"file_id_{url}")
+    if entry and entry["data"]["hash"] == content_hash(text):
+        return entry["data"]["file_id"]
+    return None
+
+
+async def save_file_id(url: str, text: str, file_id: str):
+    """Запоминает file_id документа вместе с хешем текста, из которого он собран."""
+    await cache_store.set(f"file_id_{url}", {"hash": content_hash(text), "file_id": file_id}, ttl=FILE_ID_TTL)
+
+
+async def forget_file_id(url: str):
+    await cache_store.delete(f"file_id_{url}")
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from utils.storage import SQLiteDB
+
+FSM_DB = "fsm.db"
+FSM_TTL = 24 * 60 * 60  # Через сколько секунд простоя состояние пользователя удаляется
+PURGE_EVERY = 500  # Раз в столько записей удаляются просроченные состояния
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в SQLite, общее для нескольких процессов бота.
+
+    Состояние и данные пользователя хранятся одной строкой; каждая запись
+    продлевает срок жизни на ttl, просроченные строки не читаются и
+    периодически удаляются. WAL и busy_timeout позволяют нескольким
+    воркерам работать с одним файлом.
+    """
+
+    def __init__(self, path: str = FSM_DB, ttl: Optional[int] = FSM_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._db = SQLiteDB(path, [
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, "
+            "state TEXT, "
+            "data TEXT NOT NULL DEFAULT '{}', "
+            "expires_at REAL)",
+            "CREATE INDEX IF NOT EXISTS fsm_expires_at ON fsm (expires_at)",
+        ], synchronous="NORMAL")
+        self._writes = 0
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _read(self, conn: sqlite3.Connection, key: str) -> Optional[tuple]:
+        row = conn.execute("SELECT state, data, expires_at FROM fsm WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[2] is not None and row[2] <= time.time()):
+            return None
+        return row
+
+    def _write(self, conn: sqlite3.Connection, key: str, state: Optional[str], data: dict):
+        if state is None and not data:
+            conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO fsm (key, state, data, expires_at) VALUES (?, ?, ?, ?)",
+                (key, state, json.dumps(data, ensure_ascii=False), self._expires_at()),
+            )
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM fsm WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def _update(self, conn: sqlite3.Connection, key: str, state: Any = ..., data: Optional[dict] = None,
+                merge: bool = False) -> dict:
+        """Читает и меняет строку в одной транзакции, чтобы воркеры не затирали друг друга."""
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = self._read(conn, key)
+            old_state = row[0] if row else None
+            old_data = json.loads(row[1]) if row else {}
+            new_state = old_state if state is ... else state
+            if data is None:
+                new_data = old_data
+            elif merge:
+                new_data = {**old_data, **data}
+            else:
+                new_data = data
+            self._write(conn, key, new_state, new_data)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return new_data
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._db.run(self._update, self.key_builder.build(key), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._db.run(self._read, self.key_builder.build(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._db.run(self._update, self.key_builder.build(key), ..., data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._db.run(self._read, self.key_builder.build(key))
+        return json.loads(row[1]) if row else {}
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._db.run(self._update, self.key_builder.build(key), ..., data.copy(), True)
+
+    async def close(self) -> None:
+        self._db.close()
+
+
+def create_fsm_storage(redis_url: Optional[str] = None, path: str = FSM_DB, ttl: Optional[int] = FSM_TTL) -> BaseStorage:
+    """Redis-хранилище aiogram, если задан адрес сервера, иначе SQLite-файл."""
+    redis_url = redis_url or os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+            return RedisStorage.from_url(
+                redis_url,
+                key_builder=DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True),
+                state_ttl=ttl,
+                data_ttl=ttl,
+            )
+        except ImportError:
+            print(f"{datetime.now()}: Пакет redis не установлен, FSM хранится в {path}")
+    return SQLiteStorage(path, ttl)
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import random
+import time
+from typing import Optional, Tuple
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from utils.circuit import breaker_for, CircuitOpenError
+from utils.metrics import (
+    make_trace_config, url_pattern, scrape_stage_seconds, scrape_response_bytes,
+    scrape_requests_total, scrape_errors_total,
+)
+
+# Общие заголовки для всех запросов к kadrovik.uz
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
+    "Accept-Encoding": "gzip, deflate",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+SITE_URL = "https://kadrovik.uz"
+# Другой адрес сайта (зеркало, локальный стенд для нагрузочных тестов): запросы к SITE_URL уходят туда
+SITE_MIRROR = os.getenv("SITE_MIRROR")
+
+# Параметры пула соединений
+CONNECTION_LIMIT = 100  # Всего открытых соединений
+CONNECTION_LIMIT_PER_HOST = 10  # Соединений на один хост
+DNS_CACHE_TTL = 300  # Время жизни DNS-кэша, сек
+KEEPALIVE_TIMEOUT = 30  # Сколько держать простаивающее соединение, сек
+
+# Повторы при сетевых ошибках и ответах 5xx/429
+RETRIES = 2  # Повторов сверх первой попытки
+BACKOFF_BASE = 0.5  # Пауза перед повтором: случайная от 0 до BACKOFF_BASE * 2^попытка, сек
+BACKOFF_MAX = 4
+MIN_ATTEMPT_TIME = 1  # Не начинаем попытку, если до конца timeout осталось меньше, сек
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_lock = asyncio.Lock()
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS, trace_configs=[make_trace_config()])
+
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """Создаёт общий HTTP-клиент (вызывается при старте бота)."""
+    global _session
+    async with _session_lock:
+        if _session is None or _session.closed:
+            _session = _create_session()
+    return _session
+
+
+async def close_http_session():
+    """Закрывает общий HTTP-клиент (вызывается при остановке бота)."""
+    global _session
+    async with _session_lock:
+        if _session is not None and not _session.closed:
+            await _session.close()
+        _session = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Возвращает общий HTTP-клиент, создавая его при первом обращении."""
+    if _session is None or _session.closed:
+        return await init_http_session()
+    return _session
+
+
+def _mirror(url: str) -> str:
+    if SITE_MIRROR and url.startswith(SITE_URL):
+        return SITE_MIRROR.rstrip("/") + url[len(SITE_URL):]
+    return url
+
+
+def _is_transient(error: Exception) -> bool:
+    """Ошибка, после которой имеет смысл повторить запрос."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    if isinstance(error, aiohttp.InvalidURL):
+        return False
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+async def _request(url: str, timeout: float, headers: Optional[dict] = None) -> Tuple[int, Optional[str], CIMultiDictProxy]:
+    """GET с повторами и предохранителем хоста; timeout - общее время на все попытки.
+
+    Возвращает (статус, текст, заголовки); на 304 текст None. Пока цепь хоста
+    разомкнута, сеть не трогаем и сразу бросаем CircuitOpenError.
+    """
+    breaker = breaker_for(url)
+    pattern = url_pattern(url)
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            scrape_errors_total.inc(pattern=pattern, error="CircuitOpenError")
+            raise
+        start = time.perf_counter()
+        try:
+            session = await get_http_session()
+            request_timeout = aiohttp.ClientTimeout(total=deadline - time.monotonic())
+            async with session.get(_mirror(url), headers=headers, timeout=request_timeout) as response:
+                scrape_requests_total.inc(pattern=pattern, status=response.status)
+                text = None
+                if response.status != 304:
+                    response.raise_for_status()
+                    body = await response.read()
+                    scrape_response_bytes.observe(len(body), pattern=pattern)
+                    text = await response.text()
+                scrape_stage_seconds.observe(time.perf_counter() - start, stage="download", pattern=pattern)
+                result = response.status, text, response.headers
+        except Exception as e:
+            scrape_errors_total.inc(pattern=pattern, error=type(e).__name__)
+            if not _is_transient(e):
+                breaker.record_success()  # Сайт ответил, хоть и ошибкой
+                raise
+            breaker.record_failure()
+            attempt += 1
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            if attempt > RETRIES or breaker.is_open or time.monotonic() + delay + MIN_ATTEMPT_TIME > deadline:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def fetch_text(url: str, timeout: float = 15, headers: Optional[dict] = None) -> str:
+    """Загружает страницу через общий пул соединений и возвращает её текст."""
+    _, text, _ = await _request(url, timeout, headers)
+    return text
+
+
+async def fetch_conditional(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                            timeout: float = 15) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Условный GET: возвращает (текст, ETag, Last-Modified); текст None, если страница не изменилась (304)."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    status, text, response_headers = await _request(url, timeout, headers)
+    if status == 304:
+        return None, etag, last_modified
+    return text, response_headers.get("ETag"), response_headers.get("Last-Modified")
@@ -0,0 +1,11 @@
+import hashlib
+
+
+def content_hash(text: str) -> str:
+    """Хеш текста: по нему видно, что содержимое изменилось."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def short_id(text: str, length: int = 10) -> str:
+    """Короткий стабильный идентификатор для callback_data: одинаков во всех процессах и после перезапуска."""
+    return content_hash(text)[:length]
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import cache_requests_total
+from utils.parser import listing_cache_key
+from utils.search_index import search_index
+from utils.storage import cache_store
+
+INLINE_RESULTS = 20  # Статей в ответе (Telegram принимает до 50)
+RESULT_TTL = 30  # Сколько держать ответ на набранную часть запроса в памяти, сек
+MAX_CACHED_QUERIES = 5000
+DEBOUNCE = 0.3  # Пауза перед поиском: если пользователь за это время допечатал запрос, старый не обрабатывается
+CACHE_TIME = 300  # Подсказка Telegram: сколько он сам может отдавать этот ответ, сек
+LATEST_CACHE_TIME = 60  # Для пустого запроса (свежие статьи) список меняется чаще
+
+
+def normalize(query: str) -> str:
+    """Ключ кэша: регистр и лишние пробелы не важны, пробел в конце важен (слово дописано)."""
+    words = query.lower().split()
+    return " ".join(words) + (" " if words and query[-1].isspace() else "")
+
+
+class InlineSearch:
+    """Ответы на инлайн-запросы только из локальных данных: индекс и кэш списков.
+
+    Сайт здесь не запрашивается никогда. Ответ на каждую набранную часть
+    запроса недолго хранится в памяти: одни и те же начала запросов
+    приходят от многих пользователей.
+    """
+
+    def __init__(self, ttl: float = RESULT_TTL, max_queries: int = MAX_CACHED_QUERIES, delay: float = DEBOUNCE):
+        self.ttl = ttl
+        self.max_queries = max_queries
+        self.delay = delay
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, List[dict]]]" = OrderedDict()
+        # user_id -> id последнего инлайн-запроса пользователя. Состояние в памяти процесса:
+        # при нескольких воркерах запросы одного пользователя могут уйти в разные, тогда
+        # часть лишних поисков просто не отсеется
+        self._pending: Dict[int, str] = {}
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[List[dict]]:
+        entry = self._results.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        self._results.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: Tuple[str, str], results: List[dict]):
+        self._results[key] = (time.monotonic() + self.ttl, results)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_queries:
+            self._results.popitem(last=False)
+
+    async def _debounce(self, user_id: int, query_id: str) -> bool:
+        """Ждёт паузу в наборе; False, если за это время пришёл более новый запрос."""
+        self._pending[user_id] = query_id
+        await asyncio.sleep(self.delay)
+        if self._pending.get(user_id) != query_id:
+            return False
+        del self._pending[user_id]
+        return True
+
+    async def _find(self, query: str, lang: str) -> List[dict]:
+        if not query:
+            # Пустой запрос - свежие статьи из кэша, даже устаревшего
+            entry = await cache_store.get(listing_cache_key(lang=lang), allow_stale=True)
+            articles = entry["data"][:INLINE_RESULTS] if entry else []
+        else:
+            articles = search_index.search(query, limit=INLINE_RESULTS, prefix=True)
+        return [
+            {**article, "snippet": search_index.docs.get(article["url"], {}).get("snippet", "")}
+            for article in articles
+        ]
+
+    async def lookup(self, query: str, lang: str, user_id: int, query_id: str) -> Optional[List[dict]]:
+        """Статьи для инлайн-запроса; None - пользователь уже набрал следующий, отвечать не нужно."""
+        query = normalize(query)
+        # Язык влияет только на список свежих статей, поиск идёт по всему индексу
+        key = (query, lang if not query else "")
+        results = self._cached(key)
+        if results is not None:
+            cache_requests_total.inc(cache="inline", kind="search" if query else "latest", result="hit")
+            return results
+        if not await self._debounce(user_id, query_id):
+            return None
+        # Пока ждали, тот же запрос мог найти другой пользователь
+        results = self._cached(key)
+        if results is None:
+            cache_requests_total.inc(cache="inline", kind="search" if query else "latest", result="miss")
+            results = await self._find(query, lang)
+            self._store(key, results)
+        return results
+
+
+inline_search = InlineSearch()
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from utils.http import fetch_text
+from utils.ids import short_id
+from utils.singleflight import single_flight
+from utils.storage import cache_store
+from utils.workers import extraction_pool
+
+LISTING_TTL = 60 * 60  # Сколько хранить догруженные страницы списка, сек
+MAX_LISTING_ARTICLES = 200  # Дальше кнопка "Ещё" не показывается
+MAX_FETCHES = 2  # Страниц сайта за одно нажатие "Ещё" (первая может оказаться уже известной)
+
+# Вид списка -> функция разбора страницы (html, url) -> {"articles": [...], "next_url": ...}
+_extractors: Dict[str, Callable[[str, str], dict]] = {}
+
+
+def register_source(kind: str, extract: Callable[[str, str], dict]):
+    """Подключает разбор страниц для вида списков (rubrika, search)."""
+    _extractors[kind] = extract
+
+
+def listing_id(kind: str, source: str) -> str:
+    return short_id(f"{kind}:{source}")
+
+
+def _key(lid: str) -> str:
+    return f"listing_{lid}"
+
+
+async def seed(kind: str, source: str, articles: List[dict], next_url: Optional[str]):
+    """Первая страница списка только что загружена с сайта: курсор начинается заново."""
+    lid = listing_id(kind, source)
+    entry = await cache_store.get(_key(lid))
+    title = entry["data"].get("title", "") if entry else ""
+    await cache_store.set(_key(lid), {
+        "kind": kind,
+        "title": title,
+        "articles": articles,
+        "next_url": next_url,
+        "visited": [source],
+    }, ttl=LISTING_TTL)
+
+
+async def open_listing(kind: str, source: str, title: str, articles: List[dict]) -> str:
+    """Список для показа пользователю; уже догруженные страницы берутся из кэша.
+
+    Если курсора ещё нет (статьи пришли из кэша или индекса), следующей
+    считается первая страница сайта: при первом "Ещё" она загрузится, а
+    уже показанные статьи отсеются.
+    """
+    lid = listing_id(kind, source)
+    entry = await cache_store.get(_key(lid))
+    if entry is None:
+        await cache_store.set(_key(lid), {
+            "kind": kind,
+            "title": title,
+            "articles": articles,
+            "next_url": source,
+            "visited": [],
+        }, ttl=LISTING_TTL)
+    elif entry["data"].get("title") != title:
+        await cache_store.set(_key(lid), {**entry["data"], "title": title}, ttl=LISTING_TTL)
+    return lid
+
+
+async def _extend(lid: str, need: int) -> dict:
+    """Догружает страницы сайта, пока статей меньше need; одна загрузка на список."""
+    entry = await cache_store.get(_key(lid))
+    if entry is None:
+        return {}
+    listing = entry["data"]
+    articles = listing["articles"]
+    seen = {article["url"] for article in articles}
+    extract = _extractors[listing["kind"]]
+    for _ in range(MAX_FETCHES):
+        next_url = listing["next_url"]
+        if len(articles) >= need or not next_url:
+            break
+        try:
+            html = await fetch_text(next_url, timeout=15)
+            page = await extraction_pool.run(extract, html, next_url)
+        except Exception as e:
+            print(f"{datetime.now()}: Не удалось загрузить {next_url}: {e}")
+            break
+        listing["visited"].append(next_url)
+        articles.extend(article for article in page["articles"] if article["url"] not in seen)
+        seen.update(article["url"] for article in page["articles"])
+        # Пагинация по кругу или слишком длинный список - дальше не идём
+        following = page["next_url"]
+        if following in listing["visited"] or len(articles) >= MAX_LISTING_ARTICLES:
+            following = None
+        listing["next_url"] = following
+    await cache_store.set(_key(lid), listing, ttl=LISTING_TTL)
+    return listing
+
+
+async def get_page(lid: str, offset: int, size: int) -> Optional[dict]:
+    """Статьи списка с offset: {"kind", "title", "articles", "has_more"}; None, если список устарел.
+
+    Сайт запрашивается, только когда показанные статьи подошли к концу
+    загруженных: каждое "Ещё" стоит не больше одной новой страницы.
+    """
+    entry = await cache_store.get(_key(lid))
+    if entry is None:
+        return None
+    listing = entry["data"]
+    need = offset + size
+    if len(listing["articles"]) < need and listing["next_url"]:
+        listing = await single_flight.do(f"listing_{lid}", lambda: _extend(lid, need)) or listing
+    articles = listing["articles"]
+    return {
+        "kind": listing["kind"],
+        "title": listing.get("title", ""),
+        "articles": articles[offset:need],
+        "has_more": len(articles) > need or bool(listing["next_url"]),
+    }
@@ -0,0 +1,302 @@
+"""Метрики парсеров в формате Prometheus и профилировщик медленных запросов.
+
+Метрики живут в памяти процесса и отдаются текстом на /metrics.
+Каждый воркер бота считает свои метрики отдельно.
+"""
+import bisect
+import re
+import sys
+import threading
+import time
+from collections import Counter as _Tally, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp import web
+
+# Границы корзин гистограмм
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576, 4194304)
+
+_DIGITS_RE = re.compile(r"\d")
+_KIND_RE = re.compile(r"[a-z]+")
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Счётчик с метками: counter.inc(pattern="/publish/doc/{id}")."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+
+class Gauge:
+    """Текущее значение, которое считывается функцией в момент выдачи метрик."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def collect(self):
+        yield f"{self.name} {self.read()}"
+
+
+class Histogram:
+    """Гистограмма с метками: histogram.observe(0.42, stage="download")."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], list] = {}  # метки -> [счётчики корзин..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {row[-1]}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {row[-2]}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+scrape_stage_seconds = registry.register(Histogram(
+    "kadrovik_scrape_stage_seconds", "Время этапа запроса к сайту: dns, connect, download", ("stage", "pattern"),
+))
+scrape_response_bytes = registry.register(Histogram(
+    "kadrovik_scrape_response_bytes", "Размер ответа сайта", ("pattern",), SIZE_BUCKETS,
+))
+scrape_requests_total = registry.register(Counter(
+    "kadrovik_scrape_requests_total", "Запросы к сайту по статусу ответа", ("pattern", "status"),
+))
+scrape_errors_total = registry.register(Counter(
+    "kadrovik_scrape_errors_total", "Ошибки запросов к сайту по типу", ("pattern", "error"),
+))
+extract_seconds = registry.register(Histogram(
+    "kadrovik_extract_seconds", "Разбор HTML и извлечение данных в пуле", ("func",),
+))
+extract_wait_seconds = registry.register(Histogram(
+    "kadrovik_extract_wait_seconds", "Ожидание свободного места в пуле разбора", ("func",),
+))
+cache_requests_total = registry.register(Counter(
+    "kadrovik_cache_requests_total", "Обращения к кэшу: hit, stale, expired, miss", ("cache", "kind", "result"),
+))
+update_seconds = registry.register(Histogram(
+    "kadrovik_update_seconds", "Обработка обновления Telegram", ("type",),
+))
+
+
+def url_pattern(url: str) -> str:
+    """Шаблон адреса для меток: сегменты с цифрами заменяются на {id}, запрос отбрасывается."""
+    parts = [("{id}" if _DIGITS_RE.search(part) else part) for part in urlparse(url).path.split("/") if part]
+    return "/" + "/".join(parts[:4])
+
+
+def cache_kind(key: str) -> str:
+    """Вид записи кэша по началу ключа: latest, search, rubrika, reader..."""
+    match = _KIND_RE.match(key)
+    return match.group(0) if match else "other"
+
+
+async def _on_request_start(session, ctx, params):
+    ctx.pattern = url_pattern(str(params.url))
+
+
+def _trace_start(name: str):
+    async def handler(session, ctx, params):
+        setattr(ctx, name, time.perf_counter())
+    return handler
+
+
+def _trace_end(name: str, stage: str):
+    async def handler(session, ctx, params):
+        start = getattr(ctx, name, None)
+        if start is not None:
+            scrape_stage_seconds.observe(time.perf_counter() - start, stage=stage, pattern=getattr(ctx, "pattern", ""))
+    return handler
+
+
+def make_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig для aiohttp: время DNS и установки соединения по шаблону адреса."""
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_dns_resolvehost_start.append(_trace_start("dns_start"))
+    trace.on_dns_resolvehost_end.append(_trace_end("dns_start", "dns"))
+    trace.on_connection_create_start.append(_trace_start("connect_start"))
+    trace.on_connection_create_end.append(_trace_end("connect_start", "connect"))
+    return trace
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Отдельный HTTP-сервер только с /metrics (для режима polling)."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+class SlowRequestProfiler:
+    """Сэмплирующий профилировщик: пока идут отслеживаемые запросы, фоновый поток
+    раз в interval снимает стеки всех потоков. Если запрос длился дольше
+    threshold, в лог выводятся самые частые места, где были потоки за это время.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.005, top: int = 10):
+        self.threshold = threshold
+        self.interval = interval
+        self.top = top
+        self._samples = deque(maxlen=20000)  # (время, "поток: файл:строка функция")
+        self._active = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        names = {}
+        while True:
+            with self._lock:
+                if self._active == 0:
+                    self._thread = None
+                    return
+            now = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                code = frame.f_code
+                self._samples.append(
+                    (now, f"{names.get(ident, ident)}: {code.co_filename}:{frame.f_lineno} {code.co_name}")
+                )
+            time.sleep(self.interval)
+
+    @contextmanager
+    def track(self, label: str):
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._active -= 1
+            if end - start >= self.threshold:
+                self._report(label, start, end)
+
+    def _report(self, label: str, start: float, end: float):
+        tally = _Tally(place for at, place in list(self._samples) if start <= at <= end)
+        total = sum(tally.values()) or 1
+        lines = [f"{datetime.now()}: Медленный запрос {label}: {end - start:.2f} с, {total} сэмплов"]
+        lines += [f"  {count * 100 / total:5.1f}%  {place}" for place, count in tally.most_common(self.top)]
+        print("\n".join(lines))
+
+
+profiler: Optional[SlowRequestProfiler] = None
+
+
+def enable_profiler(threshold: float, interval: float = 0.005) -> SlowRequestProfiler:
+    """Включает профилирование запросов дольше threshold секунд."""
+    global profiler
+    profiler = SlowRequestProfiler(threshold, interval)
+    return profiler
+
+
+@contextmanager
+def profile(label: str):
+    """Отслеживает блок профилировщиком, если он включён."""
+    if profiler is None:
+        yield
+        return
+    with profiler.track(label):
+        yield
@@ -1,128 +1,151 @@
-import aiohttp
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import time
-from utils.storage import load_cache, save_cache
+from datetime import datetime
+from urllib.parse import quote_plus
+from utils import listings
+from utils.content_cache import get_article_content
+from utils.http import fetch_text
+from utils.refresher import get_or_refresh
+from utils.search_index import search_index
+from utils.singleflight import coalesce
+from utils.soup import make_soup, next_page_url, POSTS_BLOCK, LONGREAD_PARTS, PAGE_BODY
+from utils.storage import cache_store
+from utils.workers import extraction_pool
 
+CACHE_TTL = 24 * 60 * 60  # Срок жизни списков статей в кэше, сек
+
+def listing_cache_key(query=None, lang="ru", limit=10):
+      """Ключ кэша для списка статей (последние или результаты поиска)"""
+      return f"latest_{lang}" if not query else f"search_{query}_{lang}"
+
+def search_url(query, lang="ru"):
+      """Адрес страницы поиска на сайте"""
+      base_url = "https://kadrovik.uz/" if lang == "ru" else "https://kadrovik.uz/uz/"
+      return f"{base_url}search?q={quote_plus(query)}"
+
+def extract_articles(html, base_url, limit=10):
+      """Список статей из блока section.posts-block (остальная страница не разбирается)"""
+      return _articles_from_soup(make_soup(html, POSTS_BLOCK), base_url, limit)
+
+def extract_search_page(html, page_url, limit=10):
+      """Статьи страницы поиска и ссылка на следующую страницу за один разбор"""
+      base_url = "https://kadrovik.uz/uz/" if "/uz/" in page_url else "https://kadrovik.uz/"
+      soup = make_soup(html, PAGE_BODY)
+      return {
+          "articles": _articles_from_soup(soup, base_url, limit),
+          "next_url": next_page_url(soup, page_url),
+      }
+
+listings.register_source("search", extract_search_page)
+
+def _articles_from_soup(soup, base_url, limit):
+      articles = []
+      posts_section = soup.select_one("section.posts-block ul.posts-list")
+      if posts_section:
+          for item in posts_section.select("li.post-card-wrapper")[:limit]:
+              article_link = item.select_one("a[href]")
+              if article_link:
+                  title = item.select_one("h4.post-card__title")
+                  date_elem = item.select_one("time.longread-post__time-published")
+                  title_text = title.text.strip() if title else "Без заголовка"
+                  date_text = date_elem["datetime"] if date_elem else datetime.now().isoformat()
+                  link = article_link["href"]
+                  if not link.startswith("http"):
+                      link = base_url.rstrip("/") + "/" + link.lstrip("/")
+                  
+                  articles.append({
+                      "title": title_text,
+                      "content": "",  # Убираем вызов fetch_article_content
+                      "date": date_text,
+                      "emoji": "📰",
+                      "url": link
+                  })
+      return articles
+
+@coalesce(listing_cache_key)
 async def fetch_articles_from_site(query=None, lang="ru", limit=10):
       """Получение списка статей с сайта Kadrovik.uz"""
-      start_time = time.time()
       base_url = "https://kadrovik.uz/" if lang == "ru" else "https://kadrovik.uz/uz/"
-      url = base_url if not query else f"{base_url}search?q={query}"
-      print(f"{datetime.now()}: Начало парсинга URL: {url}")
+      url = base_url if not query else search_url(query, lang)
+      cache_key = listing_cache_key(query, lang)
       
       try:
-          headers = {
-              "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-          }
-          async with aiohttp.ClientSession() as session:
-              async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=6)) as response:
-                  response.raise_for_status()
-                  text = await response.text()
-                  soup = BeautifulSoup(text, "html.parser")
-
-          articles = []
-          posts_section = soup.select_one("section.posts-block ul.posts-list")
-          if posts_section:
-              for item in posts_section.select("li.post-card-wrapper")[:limit]:
-                  article_link = item.select_one("a[href]")
-                  if article_link:
-                      title = item.select_one("h4.post-card__title")
-                      date_elem = item.select_one("time.longread-post__time-published")
-                      title_text = title.text.strip() if title else "Без заголовка"
-                      date_text = date_elem["datetime"] if date_elem else datetime.now().isoformat()
-                      link = article_link["href"]
-                      if not link.startswith("http"):
-                          link = base_url.rstrip("/") + "/" + link.lstrip("/")
-                      
-                      articles.append({
-                          "title": title_text,
-                          "content": "",  # Убираем вызов fetch_article_content
-                          "date": date_text,
-                          "emoji": "📰",
-                          "url": link
-                      })
-
-          print(f"{datetime.now()}: Найдено статей перед срезом: {len(posts_section.select('li.post-card-wrapper')) if posts_section else 0}")
-          print(f"{datetime.now()}: Возвращено статей после среза: {len(articles)}")
+          text = await fetch_text(url, timeout=6)
+          if query:
+              page = await extraction_pool.run(extract_search_page, text, url, limit)
+              articles = page["articles"]
+              # Курсор для кнопки "Ещё" начинается со следующей страницы поиска
+              await listings.seed("search", url, articles, page["next_url"])
+          else:
+              articles = await extraction_pool.run(extract_articles, text, base_url, limit)
           
           if not articles:
               print(f"{datetime.now()}: Не удалось найти статьи по URL: {url}")
-          print(f"{datetime.now()}: Парсинг завершен. Время: {time.time() - start_time:.2f} сек. Найдено статей: {len(articles)}")
           
-          # Сохраняем в кэш
-          cache = load_cache()
-          cache_key = f"latest_{lang}" if not query else f"search_{query}_{lang}"
-          cache[cache_key] = {
-              "timestamp": datetime.now().isoformat(),
-              "data": articles
-          }
-          save_cache(cache)
+          # Сохраняем в кэш и в поисковый индекс
+          await cache_store.set(cache_key, articles, ttl=CACHE_TTL)
+          await search_index.add_articles(articles, lang)
           return articles
       except Exception as e:
-          print(f"{datetime.now()}: Ошибка при парсинге сайта: {e}. Время: {time.time() - start_time:.2f} сек")
-          cache = load_cache()
-          cache_key = f"latest_{lang}" if not query else f"search_{query}_{lang}"
-          return cache.get(cache_key, {}).get("data", [])
+          print(f"{datetime.now()}: Ошибка при парсинге сайта {url}: {e}")
+          entry = await cache_store.get(cache_key, allow_stale=True)
+          return entry["data"] if entry else []
 
-async def fetch_article_content(url):
+def extract_article_content(html):
       """Парсер с правильными переносами строк после emoji и абзацев"""
-      try:
-          headers = {
-              "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-          }
-          
-          async with aiohttp.ClientSession() as session:
-              async with session.get(url, headers=headers, timeout=10) as response:
-                  response.raise_for_status()
-                  html = await response.text()
-          
-          soup = BeautifulSoup(html, 'html.parser')
-          
-          # 1. Заголовок и дата (без #)
-          title = soup.find('h1').get_text(strip=True) if soup.find('h1') else "Без заголовка"
-          date_elem = soup.find('time', {'class': 'longread-post__time-published'})
-          date = date_elem['datetime'] if date_elem else ""
-          
-          # 2. Ищем контейнер с контентом
-          content_block = soup.find('section', {'class': 'longread-block'}) or soup.find('body')
-          
-          if not content_block:
-              return f"📰 {title}\n📅 {date}\n\nНе удалось найти контент."
-          
-          # 3. Собираем только <p> и <strong>
-          elements = content_block.find_all(['p', 'strong'])
-          result = []
-          
-          for element in elements:
-              text = element.get_text(' ', strip=True)
-              if text:
-                  if element.name == 'strong':
-                      result.append(f"\n \n🔹 {text}\n")  # Новый абзац для 🔹
-                  else:
-                      result.append(f"{text}")       # Новый абзац для обычного текста
-          
-          # 4. Объединяем и удаляем дубликаты
-          content = ''.join(dict.fromkeys(result))
-          
-          return content if len(content) > 50 else "Не удалось извлечь текст."
+      # Строим дерево только из <h1>, <time> и <section>
+      soup = make_soup(html, LONGREAD_PARTS)
+      
+      # 1. Заголовок и дата (без #)
+      title_elem = soup.find('h1')
+      title = title_elem.get_text(strip=True) if title_elem else "Без заголовка"
+      date_elem = soup.find('time', {'class': 'longread-post__time-published'})
+      date = date_elem['datetime'] if date_elem else ""
+      
+      # 2. Ищем контейнер с контентом; полный разбор страницы только если его нет
+      content_block = soup.find('section', {'class': 'longread-block'}) or make_soup(html).find('body')
+      
+      if not content_block:
+          return f"📰 {title}\n📅 {date}\n\nНе удалось найти контент."
+      
+      # 3. Собираем только <p> и <strong>
+      elements = content_block.find_all(['p', 'strong'])
+      result = []
       
+      for element in elements:
+          text = element.get_text(' ', strip=True)
+          if text:
+              if element.name == 'strong':
+                  result.append(f"\n \n🔹 {text}\n")  # Новый абзац для 🔹
+              else:
+                  result.append(f"{text}")       # Новый абзац для обычного текста
+      
+      # 4. Объединяем и удаляем дубликаты
+      content = ''.join(dict.fromkeys(result))
+      
+      return content if len(content) > 50 else "Не удалось извлечь текст."
+
+@coalesce(lambda url: f"content_{url}")
+async def fetch_article_content(url):
+      """Текст статьи (из кэша по URL или с сайта)"""
+      try:
+          return await get_article_content(url, extract_article_content, timeout=10)
       except Exception as e:
           print(f"Ошибка: {e}")
           return None
 
 async def search_articles(query, lang):
-      """Поиск статей по запросу"""
-      cache = load_cache()
-      cache_key = f"search_{query}_{lang}"
+      """Поиск статей по запросу: сначала локальный индекс, сайт - только если ничего не нашлось"""
+      hits = search_index.search(query, lang)
+      if hits:
+          print(f"{datetime.now()}: Найдено в локальном индексе: {len(hits)} статей для запроса: {query}")
+          return hits
+
+      cache_key = listing_cache_key(query, lang)
       
-      # Проверяем кэш
-      if cache_key in cache:
-          entry = cache[cache_key]
-          timestamp = entry.get("timestamp")
-          if timestamp and (datetime.now() - datetime.fromisoformat(timestamp)) < timedelta(hours=24):
-              print(f"{datetime.now()}: Используем кэшированные данные для запроса: {query}")
-              return entry["data"]
+      # Проверяем кэш (просроченные записи store не возвращает)
+      entry = await cache_store.get(cache_key)
+      if entry:
+          print(f"{datetime.now()}: Используем кэшированные данные для запроса: {query}")
+          return entry["data"]
 
       print(f"{datetime.now()}: Парсинг сайта для запроса: {query}")
       articles = await fetch_articles_from_site(query, lang)
@@ -130,17 +153,8 @@ async def search_articles(query, lang):
 
 async def get_latest_articles(lang):
       """Получение последних статей"""
-      cache = load_cache()
-      cache_key = f"latest_{lang}"
-      
-      # Проверяем кэш
-      if cache_key in cache:
-          entry = cache[cache_key]
-          timestamp = entry.get("timestamp")
-          if timestamp and (datetime.now() - datetime.fromisoformat(timestamp)) < timedelta(hours=24):
-              print(f"{datetime.now()}: Используем кэшированные данные для последних статей ({lang})")
-              return entry["data"]
-
-      print(f"{datetime.now()}: Парсинг сайта для последних статей ({lang})")
-      articles = await fetch_articles_from_site(lang=lang)
-      return articles
\ No newline at end of file
+      # Устаревший кэш отдаётся сразу, обновление идёт в фоне
+      return await get_or_refresh(
+          listing_cache_key(lang=lang),
+          lambda: fetch_articles_from_site(lang=lang),
+      )
\ No newline at end of file
@@ -1,337 +1,446 @@
-import aiohttp
-from bs4 import BeautifulSoup
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import re
+from bs4 import Tag
+from utils import listings
+from utils.content_cache import get_article_content
+from utils.http import fetch_text
+from utils.ids import short_id
+from utils.metrics import url_pattern
+from utils.refresher import get_or_refresh
+from utils.search_index import search_index
+from utils.singleflight import coalesce
+from utils.soup import make_soup, next_page_url, PAGE_BODY
+from utils.storage import cache_store
+from utils.workers import extraction_pool
+
+CACHE_TTL = 24 * 60 * 60  # Срок жизни списков статей рубрик в кэше, сек
+
+# Рубрики, которые показываются в меню бота
+RUBRIKI = {
+    "Новые публикации": "https://kadrovik.uz/recent_publications/?group=6899",
+    "Лайфхаки кадровика": "https://kadrovik.uz/publish/group7347_lifehack_for_kadrovik",
+    "My mehnat": "https://kadrovik.uz/publish/group7318_my_mehnat_uz_k4",
+    "Прием на работу": "https://kadrovik.uz/publish/group6525_priem_na_rabotu112",
+    "Отпуска и отгулы": "https://kadrovik.uz/publish/group6566_6",
+    "Справочники": "https://kadrovik.uz/services",
+}
+
+# Заголовки блоков и признаки ссылок на разделы
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+SEE_ALL_RE = re.compile(r'Смотреть все|смотреть все', re.IGNORECASE)
+SECTION_KEYWORDS_RE = re.compile('консультации|новости|рекомендации|формы|законодательство|обучение|отвечаем')
+
+# Разделы, которые есть в меню всегда
+MAIN_CATEGORIES = {
+    "Новые публикации": "https://kadrovik.uz/recent_publications/?group=6899",
+    "Новости": "https://kadrovik.uz/recent_publications/?group=6899", 
+    "Лайфхаки кадровика": "https://kadrovik.uz/publish/group7347_lifehack_for_kadrovik",
+    "Справочники": "https://kadrovik.uz/services",
+    "My mehnat": "https://kadrovik.uz/publish/group7318_my_mehnat_uz_k4",
+    "Прием на работу": "https://kadrovik.uz/publish/group6525_priem_na_rabotu112",
+    "Отпуска и отгулы": "https://kadrovik.uz/publish/group6566_6"
+}
+
+CATEGORIES_KEY = "categories"
+CATEGORIES_TTL = 24 * 60 * 60  # Срок жизни карты разделов в кэше, сек
+CATEGORIES_RELOAD = 60  # Как часто перечитывать карту из кэша (её обновляет другой воркер), сек
+
+def extract_categories(html: str) -> Dict[str, str]:
+    """Извлекает категории из HTML главной страницы kadrovik.uz за один проход по дереву"""
+    soup = make_soup(html, PAGE_BODY)
+    see_all = {}  # Ссылки "Смотреть все" под заголовками блоков
+    sections = {}  # Основные разделы из навигации
+    heading_before = {}  # id элемента -> ближайший заголовок перед ним
+    last_heading = None
+
+    for element in soup.descendants:
+        if not isinstance(element, Tag):
+            continue
+        heading_before[id(element)] = last_heading
+        if element.name in HEADINGS:
+            last_heading = element
+            continue
+        if element.name != 'a':
+            continue
+        href = element.get('href', '')
+        if not href:
+            continue
+
+        if element.string and SEE_ALL_RE.search(element.string):
+            # Заголовок категории - ближайший перед блоком со ссылкой
+            parent = element.parent
+            title_elem = heading_before.get(id(parent))
+            if not title_elem and parent.parent:
+                # Пробуем найти в родительском элементе
+                title_elem = parent.parent.find(list(HEADINGS))
+            if title_elem:
+                see_all[title_elem.get_text(strip=True)] = href if href.startswith('http') else f"https://kadrovik.uz{href}"
+
+        # Фильтруем основные категории
+        text = element.get_text(strip=True)
+        if 3 < len(text) < 50 and not href.startswith('#') and SECTION_KEYWORDS_RE.search(text.lower()):
+            sections[text] = href if href.startswith('http') else f"https://kadrovik.uz{href}"
+
+    categories = see_all
+    categories.update(sections)
+    categories.update(MAIN_CATEGORIES)
+    return categories
 
 async def get_categories_from_main_page() -> Dict[str, str]:
     """Извлекает категории с главной страницы kadrovik.uz"""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
+        html = await fetch_text("https://kadrovik.uz/", timeout=15)
+        return await extraction_pool.run(extract_categories, html)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://kadrovik.uz/", headers=headers, timeout=15) as response:
-                response.raise_for_status()
-                html = await response.text()
+    except Exception as e:
+        print(f"Ошибка при получении категорий: {e}")
+        return {}
 
-        soup = BeautifulSoup(html, 'html.parser')
-        categories = {}
-        
-        # Ищем категории на главной странице
-        # Сначала ищем ссылки "Смотреть все" которые ведут к категориям
-        see_all_links = soup.find_all('a', string=re.compile(r'Смотреть все|смотреть все', re.IGNORECASE))
-        
-        for link in see_all_links:
-            href = link.get('href', '')
-            if href:
-                # Находим заголовок категории (обычно находится рядом с ссылкой)
-                parent = link.parent
-                if parent:
-                    # Ищем заголовок в том же блоке
-                    title_elem = parent.find_previous(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                    if not title_elem:
-                        # Пробуем найти в родительском элементе
-                        title_elem = parent.parent.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']) if parent.parent else None
-                    
-                    if title_elem:
-                        category_name = title_elem.get_text(strip=True)
-                        full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
-                        categories[category_name] = full_url
-        
-        # Дополнительно ищем основные разделы через навигацию
-        nav_links = soup.find_all('a', href=True)
-        for link in nav_links:
+# Карта разделов в памяти: меню рубрик строится из неё без обращения к сайту
+_categories: Dict[str, str] = {}
+_categories_loaded_at = 0.0
+
+async def load_categories() -> Dict[str, str]:
+    """Читает сохранённую карту разделов из кэша (при старте и раз в CATEGORIES_RELOAD)"""
+    global _categories, _categories_loaded_at
+    entry = await cache_store.get(CATEGORIES_KEY, allow_stale=True)
+    if entry and entry["data"]:
+        _categories = entry["data"]
+    _categories_loaded_at = time.monotonic()
+    return _categories
+
+@coalesce(lambda: CATEGORIES_KEY)
+async def fetch_categories() -> Dict[str, str]:
+    """Загружает карту разделов с главной страницы и сохраняет её в кэш"""
+    global _categories, _categories_loaded_at
+    categories = await get_categories_from_main_page()
+    if categories:
+        await cache_store.set(CATEGORIES_KEY, categories, ttl=CATEGORIES_TTL)
+        _categories = categories
+        _categories_loaded_at = time.monotonic()
+        return categories
+    # Сайт недоступен: остаётся последняя сохранённая карта
+    return await load_categories()
+
+async def get_rubriki() -> Dict[str, str]:
+    """Рубрики для меню: сохранённая карта разделов, пока её нет - RUBRIKI"""
+    if time.monotonic() - _categories_loaded_at > CATEGORIES_RELOAD:
+        await load_categories()
+    return _categories or RUBRIKI
+
+def rubrika_id(name: str) -> str:
+    return short_id(name, 8)
+
+_rubrika_index: Tuple[Optional[dict], Dict[str, str]] = (None, {})  # (карта, id -> название)
+
+async def find_rubrika(rid: str) -> Optional[Tuple[str, str]]:
+    """(название, адрес) рубрики по её id или None"""
+    global _rubrika_index
+    rubriki = await get_rubriki()
+    source, index = _rubrika_index
+    if source is not rubriki:
+        # Карта сменилась: индекс строится один раз на каждую её версию
+        index = {rubrika_id(name): name for name in rubriki}
+        _rubrika_index = (rubriki, index)
+    name = index.get(rid)
+    return (name, rubriki[name]) if name else None
+
+def extract_rubrika_articles(html: str, rubrika_url: str) -> List[Dict]:
+    """Извлекает список статей из HTML страницы рубрики"""
+    # <head> со скриптами и стилями не нужен: разбираем только <body>
+    return _rubrika_articles_from_soup(make_soup(html, PAGE_BODY), rubrika_url)
+
+def extract_rubrika_page(html: str, rubrika_url: str) -> Dict:
+    """Статьи страницы рубрики и ссылка на следующую страницу за один разбор"""
+    soup = make_soup(html, PAGE_BODY)
+    return {
+        "articles": _rubrika_articles_from_soup(soup, rubrika_url),
+        "next_url": next_page_url(soup, rubrika_url),
+    }
+
+def _rubrika_articles_from_soup(soup, rubrika_url: str) -> List[Dict]:
+    articles = []
+
+    # Специальная обработка для главной страницы
+    if rubrika_url == "https://kadrovik.uz/" or rubrika_url == "https://kadrovik.uz":
+        # Находим все ссылки на статьи
+        all_links = soup.find_all('a', href=True)
+        for link in all_links:
             href = link.get('href', '')
-            text = link.get_text(strip=True)
+            title_text = link.get_text(strip=True)
             
-            # Фильтруем основные категории
-            if (text and len(text) > 3 and len(text) < 50 and
-                any(keyword in text.lower() for keyword in ['консультации', 'новости', 'рекомендации', 'формы', 'законодательство', 'обучение', 'отвечаем']) and
-                href and not href.startswith('#')):
+            # Фильтруем ссылки на статьи
+            if (href and title_text and 
+                len(title_text) > 30 and  # Длинные заголовки статей
+                '/publish/' in href and
+                not any(skip in title_text.lower() for skip in ['смотреть все', 'подробнее', 'читать далее', 'показать'])):
                 
                 full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
-                categories[text] = full_url
-        
-        # Добавляем найденные на главной странице категории
-        main_categories = {
-            "Новые публикации": "https://kadrovik.uz/recent_publications/?group=6899",
-            "Новости": "https://kadrovik.uz/recent_publications/?group=6899", 
-            "Лайфхаки кадровика": "https://kadrovik.uz/publish/group7347_lifehack_for_kadrovik",
-            "Справочники": "https://kadrovik.uz/services",
-            "My mehnat": "https://kadrovik.uz/publish/group7318_my_mehnat_uz_k4",
-            "Прием на работу": "https://kadrovik.uz/publish/group6525_priem_na_rabotu112",
-            "Отпуска и отгулы": "https://kadrovik.uz/publish/group6566_6"
-        }
-        
-        # Объединяем найденные категории с основными
-        categories.update(main_categories)
-        
-        return categories
+                
+                articles.append({
+                    'title': title_text,
+                    'url': full_url,
+                    'date': datetime.now().isoformat()
+                })
+                
+                if len(articles) >= 10:
+                    break
         
-    except Exception as e:
-        print(f"Ошибка при получении категорий: {e}")
-        return {}
+        return articles
+    
+    # Для других страниц: стратегия, которая сработала на страницах с таким же шаблоном адреса
+    pattern = url_pattern(rubrika_url)
+    learned = _extraction_profiles.get(pattern)
+    if learned:
+        articles = _articles_by_strategy(soup, learned)
+        if articles:
+            return articles
 
-async def fetch_rubrika_articles(rubrika_url: str) -> List[Dict]:
-    """Парсит статьи из конкретной рубрики"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
+    strategy, articles = _learn_strategy(soup)
+    if articles:
+        if learned and strategy != learned:
+            print(f"{datetime.now()}: Разметка {pattern} изменилась: {learned} -> {strategy}")
+        _extraction_profiles[pattern] = strategy
+    else:
+        _extraction_profiles.pop(pattern, None)
+    return articles
+
+# Стратегии поиска статей на странице рубрики, от точной к самой общей;
+# LINKS_STRATEGY - все ссылки на /publish/ с длинным текстом
+LINKS_STRATEGY = "links"
+RUBRIKA_STRATEGIES = [
+    'div.publication-item',
+    'div.post-item',
+    'article',
+    'div[class*="article"]',
+    'div[class*="post"]',
+    'div[class*="publication"]',
+    '.content-item',
+    '.news-item',
+    '.item',
+    '[class*="item"]',
+    LINKS_STRATEGY,
+]
+
+# Шаблон адреса рубрики -> стратегия, которая на нём сработала
+_extraction_profiles: Dict[str, str] = {}
+
+def _learn_strategy(soup) -> Tuple[str, List[Dict]]:
+    """Полный перебор: первый селектор, который что-то нашёл, иначе все ссылки"""
+    for selector in RUBRIKA_STRATEGIES[:-1]:
+        items = soup.select(selector)
+        if items:
+            return selector, _articles_from_items(items)
+    return LINKS_STRATEGY, _articles_from_links(soup)
+
+def _articles_by_strategy(soup, strategy: str) -> List[Dict]:
+    if strategy == LINKS_STRATEGY:
+        return _articles_from_links(soup)
+    return _articles_from_items(soup.select(strategy))
+
+def _articles_from_items(items) -> List[Dict]:
+    """Статьи из найденных селектором блоков: заголовок и первая ссылка"""
+    articles = []
+    for item in items[:15]:
+        title_elem = item.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']) or item.find('a')
+        link_elem = item.find('a', href=True)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(rubrika_url, headers=headers, timeout=15) as response:
-                response.raise_for_status()
-                html = await response.text()
-
-        soup = BeautifulSoup(html, 'html.parser')
-        articles = []
-
-        # Специальная обработка для главной страницы
-        if rubrika_url == "https://kadrovik.uz/" or rubrika_url == "https://kadrovik.uz":
-            # На главной странице ищем статьи в текстовом контенте
-            text_content = soup.get_text()
+        if title_elem and link_elem:
+            title = title_elem.get_text(strip=True)
+            href = link_elem.get('href', '')
             
-            # Находим все ссылки на статьи
-            all_links = soup.find_all('a', href=True)
-            for link in all_links:
-                href = link.get('href', '')
-                title_text = link.get_text(strip=True)
+            if title and href and len(title) > 10:
+                full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
                 
-                # Фильтруем ссылки на статьи
-                if (href and title_text and 
-                    len(title_text) > 30 and  # Длинные заголовки статей
-                    '/publish/' in href and
-                    not any(skip in title_text.lower() for skip in ['смотреть все', 'подробнее', 'читать далее', 'показать'])):
-                    
-                    full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
-                    
-                    articles.append({
-                        'title': title_text,
-                        'url': full_url,
-                        'date': datetime.now().isoformat()
-                    })
-                    
-                    if len(articles) >= 10:
-                        break
-            
-            return articles
-        
-        # Для других страниц используем обычный парсинг
-        # Ищем различные возможные структуры статей
-        possible_selectors = [
-            'div.publication-item',
-            'div.post-item', 
-            'article',
-            'div[class*="article"]',
-            'div[class*="post"]',
-            'div[class*="publication"]',
-            '.content-item',
-            '.news-item',
-            '.item',
-            '[class*="item"]'
-        ]
-        
-        articles_found = []
-        
-        for selector in possible_selectors:
-            articles_found = soup.select(selector)
-            if articles_found:
-                break
-        
-        # Если не нашли через селекторы, ищем все ссылки в контенте
-        if not articles_found:
-            all_links = soup.find_all('a', href=True)
-            for link in all_links:
-                href = link.get('href', '')
-                title_text = link.get_text(strip=True)
+                articles.append({
+                    'title': title,
+                    'url': full_url,
+                    'date': datetime.now().isoformat()
+                })
                 
-                # Фильтруем ссылки на статьи
-                if (href and title_text and 
-                    len(title_text) > 20 and
-                    '/publish/' in href and
-                    not any(skip in href.lower() for skip in ['javascript:', 'mailto:', '#', 'tel:']) and
-                    not any(skip in title_text.lower() for skip in ['смотреть все', 'подробнее', 'читать', 'главная', 'контакты', 'показать'])):
-                    
-                    full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
-                    
-                    # Проверяем, не добавляли ли уже эту статью
-                    if not any(art['url'] == full_url for art in articles):
-                        articles.append({
-                            'title': title_text,
-                            'url': full_url,
-                            'date': datetime.now().isoformat()
-                        })
-                        
-                        if len(articles) >= 10:
-                            break
-        else:
-            # Если нашли статьи через селекторы
-            for item in articles_found[:15]:
-                title_elem = item.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']) or item.find('a')
-                link_elem = item.find('a', href=True)
+                if len(articles) >= 10:
+                    break
+    return articles
+
+def _articles_from_links(soup) -> List[Dict]:
+    """Запасной вариант: все ссылки на статьи в контенте"""
+    articles = []
+    seen = set()
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '')
+        title_text = link.get_text(strip=True)
+        
+        # Фильтруем ссылки на статьи
+        if (href and title_text and 
+            len(title_text) > 20 and
+            '/publish/' in href and
+            not any(skip in href.lower() for skip in ['javascript:', 'mailto:', '#', 'tel:']) and
+            not any(skip in title_text.lower() for skip in ['смотреть все', 'подробнее', 'читать', 'главная', 'контакты', 'показать'])):
+            
+            full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
+            
+            # Проверяем, не добавляли ли уже эту статью
+            if full_url not in seen:
+                seen.add(full_url)
+                articles.append({
+                    'title': title_text,
+                    'url': full_url,
+                    'date': datetime.now().isoformat()
+                })
                 
-                if title_elem and link_elem:
-                    title = title_elem.get_text(strip=True)
-                    href = link_elem.get('href', '')
-                    
-                    if title and href and len(title) > 10:
-                        full_url = href if href.startswith('http') else f"https://kadrovik.uz{href}"
-                        
-                        articles.append({
-                            'title': title,
-                            'url': full_url,
-                            'date': datetime.now().isoformat()
-                        })
-                        
-                        if len(articles) >= 10:
-                            break
-
-        return articles[:10]
+                if len(articles) >= 10:
+                    break
+    return articles
+
+async def _scrape_rubrika_page(rubrika_url: str) -> Dict:
+    """Парсит первую страницу рубрики: статьи и ссылка на следующую"""
+    try:
+        html = await fetch_text(rubrika_url, timeout=15)
+        return await extraction_pool.run(extract_rubrika_page, html, rubrika_url)
 
     except Exception as e:
         print(f"Ошибка при парсинге рубрики {rubrika_url}: {e}")
-        return []
+        return {"articles": [], "next_url": None}
 
-async def fetch_article_content(url: str) -> str:
+listings.register_source("rubrika", extract_rubrika_page)
+
+def rubrika_cache_key(rubrika_url: str) -> str:
+    """Ключ кэша для списка статей рубрики"""
+    return f"rubrika_{rubrika_url}"
+
+@coalesce(rubrika_cache_key)
+async def fetch_rubrika_articles(rubrika_url: str) -> List[Dict]:
+    """Загружает статьи рубрики с сайта и сохраняет их в кэш"""
+    page = await _scrape_rubrika_page(rubrika_url)
+    articles = page["articles"]
+    if articles:
+        await cache_store.set(rubrika_cache_key(rubrika_url), articles, ttl=CACHE_TTL)
+        await search_index.add_articles(articles, "ru")
+        # Курсор для кнопки "Ещё" начинается со следующей страницы
+        await listings.seed("rubrika", rubrika_url, articles, page["next_url"])
+        return articles
+    # Сайт недоступен или ничего не нашлось: отдаём последний удачный список
+    entry = await cache_store.get(rubrika_cache_key(rubrika_url), allow_stale=True)
+    return entry["data"] if entry else []
+
+async def get_rubrika_articles(rubrika_url: str) -> List[Dict]:
+    """Статьи рубрики из кэша; устаревший кэш отдаётся сразу и обновляется в фоне"""
+    return await get_or_refresh(
+        rubrika_cache_key(rubrika_url),
+        lambda: fetch_rubrika_articles(rubrika_url),
+    )
+
+def extract_article_content(html: str) -> str:
     """Парсит содержимое конкретной статьи"""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, timeout=15) as response:
-                response.raise_for_status()
-                html = await response.text()
+    soup = make_soup(html, PAGE_BODY)
+    
+    # Заголовок статьи
+    title = ""
+    title_selectors = ['h1', 'h2.title', '.article-title', '.post-title', '.content-title']
+    for selector in title_selectors:
+        title_elem = soup.select_one(selector)
+        if title_elem:
+            title = title_elem.get_text(strip=True)
+            break
+    
+    if not title:
+        title = "Статья с сайта kadrovik.uz"
+    
+    # Дата публикации
+    date = ""
+    date_selectors = ['time', '.date', '.published-date', '[datetime]']
+    for selector in date_selectors:
+        date_elem = soup.select_one(selector)
+        if date_elem:
+            date = date_elem.get('datetime') or date_elem.get_text(strip=True)
+            break
+    
+    # Основной контент
+    content_selectors = [
+        '.article-content',
+        '.post-content', 
+        '.content',
+        'main',
+        '.main-content',
+        '#content',
+        '.text-content'
+    ]
+    
+    content_block = None
+    for selector in content_selectors:
+        content_block = soup.select_one(selector)
+        if content_block:
+            break
+    
+    # Если не нашли основной контент, берем body, исключая навигацию
+    if not content_block:
+        content_block = soup.find('body')
+        if content_block:
+            # Удаляем навигационные элементы
+            for unwanted in content_block.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style']):
+                unwanted.decompose()
+    
+    if not content_block:
+        return f"📰 {title}\n📅 {date}\n\nНе удалось найти содержимое статьи."
 
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Заголовок статьи
-        title = ""
-        title_selectors = ['h1', 'h2.title', '.article-title', '.post-title', '.content-title']
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-                break
-        
-        if not title:
-            title = "Статья с сайта kadrovik.uz"
-        
-        # Дата публикации
-        date = ""
-        date_selectors = ['time', '.date', '.published-date', '[datetime]']
-        for selector in date_selectors:
-            date_elem = soup.select_one(selector)
-            if date_elem:
-                date = date_elem.get('datetime') or date_elem.get_text(strip=True)
-                break
-        
-        # Основной контент
-        content_selectors = [
-            '.article-content',
-            '.post-content', 
-            '.content',
-            'main',
-            '.main-content',
-            '#content',
-            '.text-content'
-        ]
-        
-        content_block = None
-        for selector in content_selectors:
-            content_block = soup.select_one(selector)
-            if content_block:
-                break
-        
-        # Если не нашли основной контент, берем body, исключая навигацию
-        if not content_block:
-            content_block = soup.find('body')
-            if content_block:
-                # Удаляем навигационные элементы
-                for unwanted in content_block.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-                    unwanted.decompose()
-        
-        if not content_block:
-            return f"📰 {title}\n📅 {date}\n\nНе удалось найти содержимое статьи."
-
-        # Извлекаем текстовый контент
-        content_parts = [f"📰 {title}"]
-        if date:
-            content_parts.append(f"📅 {date}")
-        content_parts.append("")  # Пустая строка для разделения
-        
-        # Получаем все текстовые элементы
-        text_elements = content_block.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div'])
-        
-        processed_texts = set()  # Для избежания дублирования
+    # Извлекаем текстовый контент
+    content_parts = [f"📰 {title}"]
+    if date:
+        content_parts.append(f"📅 {date}")
+    content_parts.append("")  # Пустая строка для разделения
+    
+    # Получаем все текстовые элементы
+    text_elements = content_block.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'div'])
+    
+    processed_texts = set()  # Для избежания дублирования
+    
+    for element in text_elements:
+        text = element.get_text(' ', strip=True)
         
-        for element in text_elements:
-            text = element.get_text(' ', strip=True)
+        # Фильтруем короткие и повторяющиеся тексты
+        if (text and len(text) > 20 and 
+            text not in processed_texts and
+            not any(skip in text.lower() for skip in ['javascript', 'loading', 'menu', 'навигация', 'войти', 'регистрация'])):
             
-            # Фильтруем короткие и повторяющиеся тексты
-            if (text and len(text) > 20 and 
-                text not in processed_texts and
-                not any(skip in text.lower() for skip in ['javascript', 'loading', 'menu', 'навигация', 'войти', 'регистрация'])):
-                
-                processed_texts.add(text)
-                
-                # Форматируем в зависимости от типа элемента
-                if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                    content_parts.append(f"\n🔸 {text}\n")
-                elif element.name == 'li':
-                    content_parts.append(f"• {text}")
-                else:
-                    content_parts.append(text)
-        
-        result = '\n'.join(content_parts)
-        
-        # Если контент слишком короткий, пробуем альтернативный способ
-        if len(result) < 200:
-            all_text = content_block.get_text(' ', strip=True)
-            if len(all_text) > 100:
-                result = f"📰 {title}\n📅 {date}\n\n{all_text[:2000]}..."
-        
-        return result
+            processed_texts.add(text)
+            
+            # Форматируем в зависимости от типа элемента
+            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                content_parts.append(f"\n🔸 {text}\n")
+            elif element.name == 'li':
+                content_parts.append(f"• {text}")
+            else:
+                content_parts.append(text)
+    
+    result = '\n'.join(content_parts)
+    
+    # Если контент слишком короткий, пробуем альтернативный способ
+    if len(result) < 200:
+        all_text = content_block.get_text(' ', strip=True)
+        if len(all_text) > 100:
+            result = f"📰 {title}\n📅 {date}\n\n{all_text[:2000]}..."
+    
+    return result
 
+@coalesce(lambda url: f"rubrika_content_{url}")
+async def fetch_article_content(url: str) -> str:
+    """Содержимое статьи (из кэша по URL или с сайта)"""
+    try:
+        return await get_article_content(url, extract_article_content, prefix="rubrika:", timeout=15)
     except Exception as e:
         print(f"Ошибка при парсинге статьи {url}: {e}")
         return f"Не удалось загрузить содержимое статьи. Ошибка: {str(e)}"
 
 # Функция для получения актуальных рубрик с сайта
 async def get_all_categories():
-    """Получает все категории с главной страницы"""
-    categories = await get_categories_from_main_page()
+    """Все категории: из кэша, устаревшая карта обновляется в фоне"""
+    categories = await get_or_refresh(CATEGORIES_KEY, fetch_categories)
     
     # Если не удалось получить с главной страницы, используем базовые
     if not categories:
-        categories = {
-            "Главная страница": "https://kadrovik.uz/",
-            "Новые публикации": "https://kadrovik.uz/recent_publications/?group=6899",
-            "Лайфхаки кадровика": "https://kadrovik.uz/publish/group7347_lifehack_for_kadrovik",
-            "My mehnat": "https://kadrovik.uz/publish/group7318_my_mehnat_uz_k4",
-            "Прием на работу": "https://kadrovik.uz/publish/group6525_priem_na_rabotu112",
-            "Отпуска и отгулы": "https://kadrovik.uz/publish/group6566_6",
-            "Справочники": "https://kadrovik.uz/services"
-        }
+        categories = {"Главная страница": "https://kadrovik.uz/", **RUBRIKI}
     
     return categories
 
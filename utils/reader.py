@@ -0,0 +1,74 @@
+import re
+from typing import List, Optional
+
+from utils.ids import short_id
+from utils.storage import cache_store
+
+READER_TTL = 60 * 60  # Сколько хранить нарезанные страницы статьи, сек
+PAGE_LIMIT = 4000  # Максимальная длина одной страницы (лимит Telegram - 4096)
+
+# Границы блоков: абзацы и заголовки 🔹
+_BLOCK_SPLIT_RE = re.compile(r"\n\s*\n|\n(?=\s*🔹)|(?=🔹)")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def reader_id(url: str) -> str:
+    return short_id(url, 12)
+
+
+def _split_long_block(block: str, limit: int) -> List[str]:
+    """Режет слишком длинный блок по предложениям, в крайнем случае по пробелам."""
+    parts = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(block):
+        while len(sentence) > limit:
+            cut = sentence.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            parts.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > limit:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_pages(text: str, limit: int = PAGE_LIMIT) -> List[str]:
+    """Делит текст на страницы не длиннее limit по границам абзацев и заголовков 🔹."""
+    blocks = []
+    for block in _BLOCK_SPLIT_RE.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        blocks.extend(_split_long_block(block, limit) if len(block) > limit else [block])
+
+    pages = []
+    current = ""
+    for block in blocks:
+        if current and len(current) + 2 + len(block) > limit:
+            pages.append(current)
+            current = block
+        else:
+            current = f"{current}\n\n{block}" if current else block
+    if current:
+        pages.append(current)
+    return pages
+
+
+async def save_reader(url: str, title: str, text: str, limit: int = PAGE_LIMIT, body_start: int = 0) -> dict:
+    """Нарезает статью на страницы один раз и сохраняет в кэш по URL.
+
+    body_start - где в text кончается заголовок с датой и начинается сам текст статьи.
+    """
+    reader = {"url": url, "title": title, "text": text, "body_start": body_start, "pages": split_pages(text, limit)}
+    await cache_store.set(f"reader_{reader_id(url)}", reader, ttl=READER_TTL)
+    return reader
+
+
+async def load_reader(rid: str) -> Optional[dict]:
+    """Нарезанная статья по идентификатору из callback_data."""
+    entry = await cache_store.get(f"reader_{rid}")
+    return entry["data"] if entry else None
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Set, Union
+
+from utils.singleflight import single_flight
+from utils.storage import cache_store
+
+logger = logging.getLogger(__name__)
+
+STALE_GRACE = 7 * 24 * 60 * 60  # Сколько хранить истёкшие записи для отдачи "устаревших" данных, сек
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro: Awaitable[Any]):
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def get_or_refresh(cache_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Stale-while-revalidate: отдаёт кэш сразу, истёкшую запись обновляет в фоне.
+
+    Ждать загрузку приходится только при полностью пустом кэше.
+    """
+    entry = await cache_store.get(cache_key, allow_stale=True)
+    if entry is None:
+        return await fetch()
+    if entry["expired"] and not single_flight.in_flight(cache_key):
+        _spawn(fetch())
+    return entry["data"]
+
+
+Jobs = Dict[str, Callable[[], Awaitable[Any]]]
+
+
+class BackgroundRefresher:
+    """Периодически обновляет "горячие" списки статей, чтобы обработчики читали только кэш.
+
+    jobs - словарь задач или функция, которая строит его заново перед каждым проходом.
+    """
+
+    def __init__(self, jobs: Union[Jobs, Callable[[], Awaitable[Jobs]]], interval: float):
+        self.jobs = jobs
+        self.interval = interval
+        self._task = None
+
+    async def refresh_all(self):
+        jobs = await self.jobs() if callable(self.jobs) else self.jobs
+        for name, job in jobs.items():
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Ошибка фонового обновления {name}: {e}")
+        try:
+            await cache_store.purge_expired(grace=STALE_GRACE)
+        except Exception as e:
+            logger.error(f"Ошибка очистки кэша: {e}")
+
+    async def _run(self):
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
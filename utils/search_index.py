@@ -0,0 +1,401 @@
+import asyncio
+import bisect
+import math
+import re
+import sqlite3
+import time
+from datetime import datetime
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.ids import content_hash
+from utils.storage import SQLiteDB
+from utils.workers import extraction_pool
+
+SEARCH_INDEX_DB = "search_index.db"
+LOAD_BATCH = 500  # Документов на одну задачу пула при восстановлении индекса
+SNIPPET_LENGTH = 120  # Начало текста статьи, которое держим в памяти для подсказок
+RELOAD_OVERLAP = 60  # При перечитывании берём строки чуть раньше последней увиденной: записи других процессов могут опаздывать, сек
+
+# Параметры ранжирования BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3  # Слова заголовка весят как три вхождения в тексте
+
+_TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+_APOSTROPHES = str.maketrans({"ʻ": "'", "ʼ": "'", "‘": "'", "’": "'", "`": "'", "ё": "е"})
+_CYRILLIC_RE = re.compile(r"[а-яўқғҳ]")
+
+STOP_WORDS = {
+    # русский
+    "и", "в", "во", "не", "на", "с", "со", "по", "к", "ко", "о", "об", "от", "до", "из", "за", "для",
+    "что", "как", "а", "но", "или", "ли", "же", "бы", "это", "при", "под", "над", "у", "без",
+    # узбекский
+    "va", "bilan", "uchun", "bu", "u", "ham", "esa", "yoki", "ва", "билан", "учун", "бу", "ҳам",
+}
+
+# Окончания отсортированы от длинных к коротким: отрезаем самое длинное подходящее
+RU_SUFFIXES = sorted([
+    "ться", "ется", "ются", "иями", "ями", "ами", "иях", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ием", "ией", "ает", "яет", "ают", "яют", "ала", "ила", "ыла", "ило", "али",
+    "ях", "ах", "ое", "ие", "ые", "ой", "ей", "ий", "ый", "ая", "яя", "ую", "юю", "ых", "их",
+    "ом", "ем", "ам", "ям", "ов", "ев", "ия", "ья", "ье", "ии", "ью", "ть",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+], key=len, reverse=True)
+UZ_SUFFIXES = sorted([
+    "larining", "laridan", "larida", "larini", "lariga", "lardan", "larda", "larga", "larni", "lari",
+    "ning", "dan", "lar", "da", "ga", "ka", "qa", "ni", "si", "i",
+    "ларининг", "ларидан", "ларида", "ларини", "ларига", "лардан", "ларда", "ларга", "ларни", "лари",
+    "нинг", "дан", "лар", "да", "га", "ни", "си",
+], key=len, reverse=True)
+MIN_STEM = 3
+
+# Дописывание последнего слова запроса (инлайн-режим): с какой длины и сколько вариантов брать
+MIN_PREFIX = 3
+MAX_COMPLETIONS = 20
+MAX_NEW_TERMS = 1000  # Сколько новых основ копить до пересортировки словаря в пуле
+
+
+def stem(word: str) -> str:
+    """Лёгкий стемминг: отрезает типичные русские и узбекские окончания."""
+    suffixes = RU_SUFFIXES + UZ_SUFFIXES if _CYRILLIC_RE.search(word) else UZ_SUFFIXES
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на нормализованные основы слов без стоп-слов."""
+    text = text.lower().translate(_APOSTROPHES)
+    return [stem(token) for token in _TOKEN_RE.findall(text) if token not in STOP_WORDS]
+
+
+def count_terms(text: str) -> Counter:
+    """Частоты основ в тексте статьи."""
+    return Counter(tokenize(text))
+
+
+def summarize(text: str) -> Tuple[str, str, Counter]:
+    """Хеш, начало и частоты основ текста статьи; выполняется в пуле разбора, а не в event loop."""
+    snippet = " ".join(text[:SNIPPET_LENGTH].split())
+    if len(text) > SNIPPET_LENGTH:
+        snippet += "…"
+    return content_hash(text), snippet, count_terms(text)
+
+
+def summarize_batch(texts: List[str]) -> List[Tuple[str, str, Counter]]:
+    """summarize для пачки текстов одной задачей пула."""
+    return [summarize(text) for text in texts]
+
+
+def sort_terms(terms: List[str]) -> List[str]:
+    return sorted(terms)
+
+
+def title_terms(title: str) -> Counter:
+    """Частоты основ заголовка с его весом; заголовки короткие, их можно считать на месте."""
+    terms = Counter()
+    for term in tokenize(title):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+
+class SearchIndex:
+    """Инвертированный индекс по уже загруженным статьям с ранжированием BM25.
+
+    В памяти только индекс и короткое описание статей; полный текст хранится
+    в SQLite, чтобы после перезапуска восстановить индекс без сети. Базу могут
+    пополнять несколько процессов (бот и обходчик): запись не затирает чужие
+    непустые поля.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_DB):
+        self.path = path
+        self.docs: Dict[str, dict] = {}  # url -> {"title", "date", "lang", "hash", "snippet"}
+        self._postings: Dict[str, Dict[str, int]] = {}  # основа -> {url: частота}
+        self._doc_len: Dict[str, int] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}  # url -> основы документа, чтобы удалять его без токенизации
+        self._total_len = 0
+        # Словарь для поиска по началу слова: отсортированная часть (удалённые основы
+        # убираются при пересортировке) и основы, появившиеся после неё
+        self._terms: List[str] = []
+        self._new_terms: List[str] = []
+        self._sorter: Optional[asyncio.Task] = None
+        self._loaded_until: Optional[float] = None  # updated_at последней прочитанной строки
+        self._reloader: Optional[asyncio.Task] = None
+        self._db = SQLiteDB(path, [
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "url TEXT PRIMARY KEY, title TEXT, date TEXT, lang TEXT, text TEXT, updated_at REAL NOT NULL DEFAULT 0)",
+        ], on_open=self._upgrade_schema)
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection):
+        # Базы, созданные до появления updated_at
+        if "updated_at" not in {row[1] for row in conn.execute("PRAGMA table_info(docs)")}:
+            conn.execute("ALTER TABLE docs ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS docs_updated_at ON docs (updated_at, url)")
+        conn.commit()
+
+    @staticmethod
+    def _load_rows(conn: sqlite3.Connection, after: Tuple[float, str], limit: int) -> list:
+        return conn.execute(
+            "SELECT url, title, date, lang, text, updated_at FROM docs "
+            "WHERE (updated_at, url) > (?, ?) ORDER BY updated_at, url LIMIT ?",
+            (*after, limit),
+        ).fetchall()
+
+    @staticmethod
+    def _save_rows(conn: sqlite3.Connection, rows: list):
+        """Строки (url, title, date, lang, text): пустые поля и text=None не затирают сохранённые.
+
+        Дата остаётся первой записанной.
+        """
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO docs (url, title, date, lang, text, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET "
+            "title = COALESCE(NULLIF(excluded.title, ''), docs.title), "
+            "date = COALESCE(NULLIF(docs.date, ''), excluded.date), "
+            "lang = COALESCE(excluded.lang, docs.lang), "
+            "text = COALESCE(NULLIF(excluded.text, ''), docs.text), "
+            "updated_at = excluded.updated_at",
+            [row + (now,) for row in rows],
+        )
+        conn.commit()
+
+    async def load(self):
+        """Восстанавливает индекс из SQLite при старте.
+
+        Повторные вызовы читают только строки, записанные с прошлого раза,
+        в том числе другими процессами (обходчиком utils.crawler). Тексты
+        читаются пачками и разбираются в пуле.
+        """
+        after = (self._loaded_until - RELOAD_OVERLAP if self._loaded_until is not None else -1.0, "")
+        while True:
+            rows = await self._db.run(self._load_rows, after, LOAD_BATCH)
+            if not rows:
+                break
+            after = (rows[-1][5], rows[-1][0])
+            self._loaded_until = max(self._loaded_until or 0, after[0])
+            summaries = await extraction_pool.run(summarize_batch, [row[4] or "" for row in rows])
+            for (url, title, date, lang, text, _), (digest, snippet, text_counts) in zip(rows, summaries):
+                doc = {"title": title or "", "date": date or "", "lang": lang, "hash": digest, "snippet": snippet}
+                old = self.docs.get(url, {})
+                if old and (not text or digest == old["hash"]):
+                    self._merge(url, {**doc, "hash": old["hash"], "snippet": old["snippet"]}, old)
+                else:
+                    self._index(url, doc, text_counts)
+            if len(rows) < LOAD_BATCH:
+                break
+        if self._loaded_until is None:
+            self._loaded_until = 0
+        await self._sort_terms()
+
+    async def _reload_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"{datetime.now()}: Ошибка при перечитывании поискового индекса: {e}")
+
+    def start_reload(self, interval: float):
+        """Раз в interval секунд подхватывает статьи, проиндексированные другими процессами."""
+        if self._reloader is None and interval > 0:
+            self._reloader = asyncio.create_task(self._reload_loop(interval))
+
+    async def _sort_terms(self):
+        """Вливает новые основы в отсортированный словарь; сортировка идёт в пуле разбора."""
+        if self._sorter is not None and self._sorter is not asyncio.current_task():
+            await asyncio.shield(self._sorter)
+            return
+        if not self._new_terms:
+            return
+        merged = len(self._new_terms)
+        terms = await extraction_pool.run(sort_terms, list(self._postings))
+        self._terms = terms
+        # Основы, добавленные во время сортировки, остаются в списке новых
+        del self._new_terms[:merged]
+
+    def _schedule_sort(self):
+        if self._sorter is None:
+            self._sorter = asyncio.ensure_future(self._sort_terms())
+            self._sorter.add_done_callback(self._sort_done)
+
+    def _sort_done(self, task: asyncio.Task):
+        self._sorter = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"{datetime.now()}: Ошибка при сортировке словаря индекса: {task.exception()}")
+
+    def _add_term(self, term: str):
+        """Новая основа попадает в словарь для поиска по началу слова без пересортировки."""
+        self._postings[term] = {}
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            return  # Основу удаляли, но из отсортированного словаря она ещё не убрана
+        self._new_terms.append(term)
+        if len(self._new_terms) > MAX_NEW_TERMS:
+            self._schedule_sort()
+
+    def _unindex(self, url: str):
+        self._total_len -= self._doc_len.pop(url, 0)
+        for term in self._doc_terms.pop(url, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(url, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _apply(self, url: str, delta: Counter):
+        """Меняет частоты основ документа на delta: только слияние словарей, без токенизации."""
+        terms = set(self._doc_terms.get(url, ()))
+        for term, change in delta.items():
+            if not change:
+                continue
+            if term not in self._postings:
+                self._add_term(term)
+            postings = self._postings[term]
+            tf = postings.get(url, 0) + change
+            if tf > 0:
+                postings[url] = tf
+                terms.add(term)
+            else:
+                postings.pop(url, None)
+                terms.discard(term)
+                if not postings:
+                    del self._postings[term]
+        change = sum(delta.values())
+        self._doc_len[url] = self._doc_len.get(url, 0) + change
+        self._total_len += change
+        self._doc_terms[url] = tuple(terms)
+
+    def _index(self, url: str, doc: dict, text_counts: Counter):
+        """Индексирует документ заново по уже посчитанным частотам текста."""
+        self._unindex(url)
+        self._apply(url, text_counts + title_terms(doc["title"]))
+        self.docs[url] = doc
+
+    def _retitle(self, url: str, doc: dict):
+        """Текст не изменился: пересчитываются только основы заголовка."""
+        delta = title_terms(doc["title"])
+        delta.subtract(title_terms(self.docs[url]["title"]))
+        self._apply(url, delta)
+        self.docs[url] = doc
+
+    def _merge(self, url: str, doc: dict, old: dict) -> bool:
+        """Обновление без нового текста; True, если документ изменился."""
+        if doc == old:
+            return False
+        if not old:
+            self._index(url, doc, Counter())
+        elif doc["title"] != old["title"]:
+            self._retitle(url, doc)
+        else:
+            self.docs[url] = doc
+        return True
+
+    async def add(self, url: str, title: str = "", text: str = "", date: str = "", lang: Optional[str] = None):
+        """Добавляет или обновляет статью; пустые поля берутся из уже проиндексированной версии.
+
+        Основы нового текста считаются в пуле разбора; в event loop только слияние словарей.
+        """
+        old = self.docs.get(url, {})
+        doc = {
+            "title": title or old.get("title", ""),
+            "date": old.get("date") or date,
+            "lang": lang or old.get("lang"),
+            "hash": old.get("hash", ""),
+            "snippet": old.get("snippet", ""),
+        }
+        new_text = bool(text) and content_hash(text) != doc["hash"]
+        if new_text:
+            doc["hash"], doc["snippet"], text_counts = await extraction_pool.run(summarize, text)
+            self._index(url, doc, text_counts)
+        elif not self._merge(url, doc, old):
+            return
+        await self._db.run(self._save_rows, [(url, title, date, lang, text if new_text else None)])
+
+    async def add_articles(self, articles: Iterable[dict], lang: Optional[str] = None):
+        """Добавляет список статей вида {"title", "url", "date"} одной записью в SQLite.
+
+        Текст статьи здесь не записывается и заново не разбирается. Дата остаётся
+        первой увиденной: в списках рубрик она равна времени загрузки.
+        """
+        rows = []
+        for article in articles:
+            url = article["url"]
+            old = self.docs.get(url, {})
+            doc = {
+                "title": article.get("title") or old.get("title", ""),
+                "date": old.get("date") or article.get("date", ""),
+                "lang": lang or old.get("lang"),
+                "hash": old.get("hash", ""),
+                "snippet": old.get("snippet", ""),
+            }
+            if self._merge(url, doc, old):
+                rows.append((url, article.get("title", ""), article.get("date", ""), lang, None))
+        if rows:
+            await self._db.run(self._save_rows, rows)
+
+    def _complete(self, prefix: str) -> List[str]:
+        """Основы, начинающиеся с prefix: самые частые первыми."""
+        if len(prefix) < MIN_PREFIX:
+            return [prefix]
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + "\uffff", start)
+        candidates = set(self._terms[start:end])
+        candidates.update(term for term in self._new_terms if term.startswith(prefix))
+        matches = sorted(
+            (term for term in candidates if term in self._postings),
+            key=lambda term: len(self._postings[term]), reverse=True,
+        )
+        return matches[:MAX_COMPLETIONS] or [prefix]
+
+    def search(self, query: str, lang: Optional[str] = None, limit: int = 10, prefix: bool = False) -> List[dict]:
+        """Ищет статьи по запросу, лучшие по BM25 первыми.
+
+        prefix=True - запрос набирается прямо сейчас: последнее слово
+        может быть недописано и ищется по началу.
+        """
+        tokens = tokenize(query)
+        terms = set(tokens)
+        if prefix and tokens and not query[-1].isspace():
+            terms = set(tokens[:-1]) | set(self._complete(tokens[-1]))
+        if not terms or not self.docs:
+            return []
+        total_docs = len(self.docs)
+        avg_len = self._total_len / total_docs or 1
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for url, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[url] / avg_len)
+                scores[url] = scores.get(url, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        results = []
+        for url in sorted(scores, key=scores.get, reverse=True):
+            doc = self.docs[url]
+            if lang and doc["lang"] and doc["lang"] != lang:
+                continue
+            results.append({
+                "title": doc["title"] or doc["snippet"][:80],
+                "url": url,
+                "date": doc["date"],
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+    def close(self):
+        for task in (self._reloader, self._sorter):
+            if task is not None:
+                task.cancel()
+        self._reloader = None
+        self._db.close()
+
+
+search_index = SearchIndex()
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.metrics import registry, Gauge
+
+# Лимиты Telegram: около 30 сообщений в секунду всего и 1 в секунду в один чат
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+CHAT_RATE = 1
+CHAT_BURST = 3
+MAX_RETRIES = 3  # Сколько раз повторять запрос после RetryAfter
+MAX_CHAT_BUCKETS = 10000
+
+# Приоритеты: меньше - раньше
+INTERACTIVE = 0
+BULK = 10
+
+# Методы, на которые действуют лимиты отправки
+LIMITED_METHODS = {
+    "sendMessage", "sendDocument", "sendPhoto", "sendMediaGroup", "copyMessage", "forwardMessage",
+    "editMessageText", "editMessageReplyMarkup",
+}
+
+send_priority: ContextVar[int] = ContextVar("send_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def bulk_sends():
+    """Отправки внутри блока (рассылки, фоновые задачи) уступают ответам пользователям."""
+    token = send_priority.set(BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше burst про запас."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько ждать до свободного токена."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def reserve(self) -> float:
+        """Забирает токен в долг и возвращает, сколько ждать своей очереди."""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """Запрещает отправку на seconds секунд (ответ RetryAfter)."""
+        self._refill()
+        self.tokens = min(self.tokens, 1) - seconds * self.rate
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Очередь исходящих запросов бота с лимитами на чат и на бота в целом.
+
+    Подключается к сессии бота: bot.session.middleware(send_scheduler).
+    Сначала ждём токен чата (порядок сообщений в чате сохраняется), затем
+    глобальный токен; глобальная очередь отдаёт токены по приоритету, поэтому
+    ответы пользователям обгоняют рассылки. После RetryAfter чат (или весь бот)
+    ставится на паузу на указанное время, и запрос повторяется.
+    Лимиты действуют в пределах процесса: при нескольких воркерах main.py
+    делит между ними лимит на бота.
+    """
+
+    def __init__(self, rate: float = GLOBAL_RATE, burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST, max_retries: int = MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(rate, burst)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._waiters: List[tuple] = []  # (приоритет, номер, future)
+        self._seq = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+        self._chat_waiting = 0
+        self._waits = deque(maxlen=1000)  # Последние времена ожидания, сек
+        self._counters = {"sent": 0, "retry_after": 0, "failed": 0}
+
+    def configure(self, rate: float = GLOBAL_RATE, burst: float = GLOBAL_BURST,
+                  chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST):
+        """Меняет лимиты (например, снимает их для нагрузочного теста)."""
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(rate, burst)
+        self._chats = {}
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                # Полные вёдра ничего не помнят, их можно выбросить
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def _run_pump(self):
+        while self._waiters:
+            delay = self._global.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._global.take()
+                future.set_result(None)
+        self._pump = None
+
+    async def _acquire_global(self, priority: int):
+        if not self._waiters and self._global.delay() == 0:
+            self._global.take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._run_pump())
+        await future
+
+    async def acquire(self, chat_id=None, priority: Optional[int] = None):
+        """Ждёт, пока можно отправить сообщение в chat_id."""
+        start = time.monotonic()
+        if chat_id is not None:
+            delay = self._chat_bucket(chat_id).reserve()
+            if delay > 0:
+                self._chat_waiting += 1
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    self._chat_waiting -= 1
+        await self._acquire_global(send_priority.get() if priority is None else priority)
+        self._waits.append(time.monotonic() - start)
+
+    def _pause(self, chat_id, seconds: float):
+        bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+        bucket.pause(seconds)
+
+    async def __call__(self, make_request, bot, method):
+        if getattr(method, "__api_method__", None) not in LIMITED_METHODS:
+            return await make_request(bot, method)
+        chat_id = getattr(method, "chat_id", None)
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id)
+            try:
+                response = await make_request(bot, method)
+                self._counters["sent"] += 1
+                return response
+            except TelegramRetryAfter as e:
+                self._counters["retry_after"] += 1
+                print(f"{datetime.now()}: RetryAfter {e.retry_after} с для чата {chat_id}")
+                if attempt == self.max_retries:
+                    self._counters["failed"] += 1
+                    raise
+                self._pause(chat_id, e.retry_after)
+
+    def stats(self) -> dict:
+        """Длина очередей и время ожидания перед отправкой."""
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": len(self._waiters) + self._chat_waiting,
+            "global_waiting": len(self._waiters),
+            "chat_waiting": self._chat_waiting,
+            "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p99": waits[int(len(waits) * 0.99)] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+            **self._counters,
+        }
+
+
+send_scheduler = SendScheduler()
+
+registry.register(Gauge(
+    "kadrovik_send_queue_depth", "Сообщений в очереди на отправку", lambda: send_scheduler.stats()["queue_depth"],
+))
+registry.register(Gauge(
+    "kadrovik_send_queue_wait_p99_seconds", "99-й перцентиль ожидания в очереди", lambda: send_scheduler.stats()["wait_p99"],
+))
+registry.register(Gauge(
+    "kadrovik_send_retry_after_responses", "Ответов RetryAfter от Telegram с момента запуска", lambda: send_scheduler.stats()["retry_after"],
+))
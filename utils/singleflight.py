@@ -0,0 +1,37 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Объединяет одновременные запросы с одинаковым ключом в одну загрузку."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет func() один раз на ключ; остальные вызовы ждут и получают тот же результат."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(key_func: Callable[..., str]):
+    """Декоратор: одновременные вызовы с одинаковым key_func(*args) делят одну загрузку."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            return await single_flight.do(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from utils.storage import cache_store
+
+SNAPSHOT_TTL = 7 * 24 * 60 * 60  # Сколько кнопки под старым списком остаются рабочими, сек
+HOT_SNAPSHOTS = 1000  # Сколько снимков держать в памяти
+
+
+class ArticleRecord:
+    """Компактная неизменяемая запись о статье в списке."""
+
+    __slots__ = ("title", "url", "date")
+
+    def __init__(self, title: str, url: str, date: str):
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "url", url)
+        object.__setattr__(self, "date", date)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ArticleRecord неизменяем")
+
+    def to_dict(self) -> dict:
+        return {"title": self.title, "url": self.url, "date": self.date}
+
+
+class Snapshot:
+    """Неизменяемый снимок списка статей. id зависит только от содержимого,
+    поэтому один и тот же список получает один id во всех процессах и после перезапуска."""
+
+    __slots__ = ("id", "articles")
+
+    def __init__(self, articles: Tuple[ArticleRecord, ...]):
+        digest = hashlib.sha1()
+        for article in articles:
+            digest.update(f"{article.url}\n{article.title}\n{article.date}\n".encode("utf-8"))
+        self.id = digest.hexdigest()[:10]
+        self.articles = articles
+
+    def __len__(self):
+        return len(self.articles)
+
+    def __getitem__(self, index: int) -> ArticleRecord:
+        return self.articles[index]
+
+
+class SnapshotRegistry:
+    """Общий реестр снимков: список хранится один раз, пользователи ссылаются на него по id."""
+
+    def __init__(self, size: int = HOT_SNAPSHOTS):
+        self.size = size
+        self._hot: "OrderedDict[str, Snapshot]" = OrderedDict()
+
+    def _remember(self, snapshot: Snapshot):
+        self._hot[snapshot.id] = snapshot
+        self._hot.move_to_end(snapshot.id)
+        if len(self._hot) > self.size:
+            self._hot.popitem(last=False)
+
+    async def publish(self, articles: Iterable[dict]) -> Snapshot:
+        """Создаёт (или находит уже существующий) снимок списка статей."""
+        snapshot = Snapshot(tuple(
+            ArticleRecord(article.get("title", ""), article["url"], article.get("date", ""))
+            for article in articles
+        ))
+        if snapshot.id not in self._hot:
+            await cache_store.set(
+                f"snapshot_{snapshot.id}",
+                [[a.title, a.url, a.date] for a in snapshot.articles],
+                ttl=SNAPSHOT_TTL,
+            )
+        self._remember(snapshot)
+        return snapshot
+
+    async def get(self, snapshot_id: str) -> Optional[Snapshot]:
+        snapshot = self._hot.get(snapshot_id)
+        if snapshot is not None:
+            self._hot.move_to_end(snapshot_id)
+            return snapshot
+        entry = await cache_store.get(f"snapshot_{snapshot_id}")
+        if entry is None:
+            return None
+        snapshot = Snapshot(tuple(ArticleRecord(*row) for row in entry["data"]))
+        self._remember(snapshot)
+        return snapshot
+
+
+snapshots = SnapshotRegistry()
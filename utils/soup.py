@@ -0,0 +1,55 @@
+import os
+from typing import Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Быстрые парсеры в порядке предпочтения; html.parser есть всегда
+_FAST_BACKENDS = ("lxml",)
+_FALLBACK_BACKEND = "html.parser"
+
+
+def _detect_backend() -> str:
+    """Выбирает парсер: HTML_PARSER из окружения или самый быстрый из установленных."""
+    forced = os.getenv("HTML_PARSER")
+    if forced:
+        return forced
+    for backend in _FAST_BACKENDS:
+        try:
+            __import__(backend)
+            return backend
+        except ImportError:
+            continue
+    return _FALLBACK_BACKEND
+
+
+PARSER_BACKEND = _detect_backend()
+
+# Стрейнеры для частичного разбора: строим только нужные поддеревья
+POSTS_BLOCK = SoupStrainer("section", class_="posts-block")
+LONGREAD_PARTS = SoupStrainer(["h1", "time", "section"])
+PAGE_BODY = SoupStrainer("body")
+
+
+def make_soup(html: str, parse_only: Optional[SoupStrainer] = None, backend: Optional[str] = None) -> BeautifulSoup:
+    """Разбирает HTML выбранным парсером; parse_only ограничивает дерево нужными тегами."""
+    return BeautifulSoup(html, backend or PARSER_BACKEND, parse_only=parse_only)
+
+
+# Признаки ссылки на следующую страницу в пагинации
+NEXT_PAGE_TEXTS = {"»", "›", "→", "далее", "следующая", "следующая страница", "keyingi"}
+
+
+def next_page_url(soup: BeautifulSoup, page_url: str) -> Optional[str]:
+    """Ссылка на следующую страницу списка: rel="next" или кнопка в блоке пагинации."""
+    link = soup.find("a", rel="next", href=True)
+    if not link:
+        for candidate in soup.select('[class*="pagination"] a[href], [class*="pager"] a[href]'):
+            classes = " ".join(candidate.get("class") or [])
+            if "next" in classes or candidate.get_text(strip=True).lower() in NEXT_PAGE_TEXTS:
+                link = candidate
+                break
+    if not link:
+        return None
+    next_url = urljoin(page_url, link["href"])
+    return next_url if next_url != page_url else None
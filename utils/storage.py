@@ -1,21 +1,178 @@
+import asyncio
 import json
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
 
-def load_cache():
-    """Загружает кэш из файла."""
-    try:
-        if os.path.exists("cache.json"):
-            with open("cache.json", "r") as f:
-                return json.load(f)
-        return {}
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
-
-def save_cache(cache):
-    """Сохраняет кэш в файл."""
+from utils.metrics import cache_requests_total, cache_kind
+
+CACHE_DB = "cache.db"
+LEGACY_CACHE_FILE = "cache.json"
+DEFAULT_TTL = 24 * 60 * 60  # Срок жизни записи по умолчанию, сек
+BUSY_TIMEOUT_MS = 5000  # Сколько ждать блокировку, если базу пишет другой процесс
+
+
+class SQLiteDB:
+    """Файл SQLite для модулей бота: одно соединение, блокировка и вызовы вне event loop.
+
+    Соединение открывается при первом обращении: WAL, busy_timeout, схема
+    (список SQL-команд), затем on_open(conn) - однократные переносы и
+    доработки схемы. Функции доступа получают соединение первым аргументом.
+    """
+
+    def __init__(self, path: str, schema: Sequence[str] = (),
+                 on_open: Optional[Callable[[sqlite3.Connection], None]] = None, synchronous: Optional[str] = None):
+        self.path = path
+        self.schema = schema
+        self.on_open = on_open
+        self.synchronous = synchronous  # Например NORMAL: в режиме WAL fsync только на контрольных точках
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            for statement in self.schema:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+            if self.on_open:
+                self.on_open(conn)
+        return self._conn
+
+    def call(self, func: Callable[..., Any], *args) -> Any:
+        """Выполняет func(conn, *args) под блокировкой соединения."""
+        with self._lock:
+            return func(self._connect(), *args)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """То же, что call, но в отдельном потоке, не блокируя event loop."""
+        return await asyncio.to_thread(self.call, func, *args)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def migrate_legacy_json(conn: sqlite3.Connection, legacy_file: Optional[str], insert_sql: str,
+                        rows: Callable[[Dict[str, Any]], Iterable[tuple]]):
+    """Однократно переносит записи из старого JSON-файла в таблицу и переименовывает файл."""
+    if not legacy_file or not os.path.exists(legacy_file):
+        return
     try:
-        with open("cache.json", "w") as f:
-            json.dump(cache, f, indent=4)
+        with open(legacy_file, "r") as f:
+            legacy = json.load(f)
+        conn.executemany(insert_sql, rows(legacy))
+        conn.commit()
+        os.replace(legacy_file, legacy_file + ".migrated")
     except Exception as e:
-        print(f"{datetime.now()}: Ошибка при сохранении кэша: {e}")
\ No newline at end of file
+        print(f"{datetime.now()}: Ошибка при переносе {legacy_file}: {e}")
+
+
+class CacheStore:
+    """Кэш ключ-значение в SQLite: запись и чтение по одному ключу, срок жизни у каждой записи."""
+
+    def __init__(self, path: str = CACHE_DB, max_entries: Optional[int] = None, legacy_file: Optional[str] = None):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]  # Для метрик
+        self.max_entries = max_entries  # При превышении удаляются самые старые записи
+        self.legacy_file = legacy_file
+        self._db = SQLiteDB(path, [
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)",
+            "CREATE INDEX IF NOT EXISTS cache_updated_at ON cache (updated_at)",
+        ], on_open=self._migrate_legacy_file, synchronous="NORMAL")
+
+    def _migrate_legacy_file(self, conn: sqlite3.Connection):
+        """Однократно переносит записи из старого cache.json."""
+        def rows(legacy):
+            for key, entry in legacy.items():
+                try:
+                    updated_at = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                    value = json.dumps(entry["data"], ensure_ascii=False)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                yield key, value, updated_at, updated_at + DEFAULT_TTL
+        migrate_legacy_json(conn, self.legacy_file, "INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _select(conn: sqlite3.Connection, key: str) -> Optional[tuple]:
+        return conn.execute("SELECT value, updated_at, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+
+    def _get(self, key: str, allow_stale: bool) -> Optional[dict]:
+        row = self._db.call(self._select, key)
+        if row is None:
+            cache_requests_total.inc(cache=self.name, kind=cache_kind(key), result="miss")
+            return None
+        expired = row[2] <= time.time()
+        if expired and not allow_stale:
+            cache_requests_total.inc(cache=self.name, kind=cache_kind(key), result="expired")
+            return None
+        cache_requests_total.inc(cache=self.name, kind=cache_kind(key), result="stale" if expired else "hit")
+        return {
+            "data": json.loads(row[0]),
+            "timestamp": datetime.fromtimestamp(row[1]).isoformat(),
+            "expired": expired,
+        }
+
+    def _set(self, conn: sqlite3.Connection, key: str, value: str, ttl: float):
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, value, now, now + ttl),
+        )
+        if self.max_entries is not None:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY updated_at "
+                "LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+                (self.max_entries,),
+            )
+        conn.commit()
+
+    def _delete(self, conn: sqlite3.Connection, key: str):
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def _purge_expired(self, conn: sqlite3.Connection, grace: float) -> int:
+        deleted = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time() - grace,)).rowcount
+        conn.commit()
+        return deleted
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        """Возвращает {"data", "timestamp", "expired"} или None.
+
+        Истёкшие записи возвращаются только при allow_stale=True (пока их не удалил purge_expired).
+        """
+        return await asyncio.to_thread(self._get, key, allow_stale)
+
+    async def set(self, key: str, data: Any, ttl: float = DEFAULT_TTL):
+        """Сохраняет одну запись со своим сроком жизни."""
+        # Сериализуем до захвата блокировки соединения
+        await self._db.run(self._set, key, json.dumps(data, ensure_ascii=False), ttl)
+
+    async def delete(self, key: str):
+        await self._db.run(self._delete, key)
+
+    async def purge_expired(self, grace: float = 0) -> int:
+        """Удаляет записи, истёкшие более grace секунд назад, возвращает их количество."""
+        return await self._db.run(self._purge_expired, grace)
+
+    def close(self):
+        self._db.close()
+
+
+cache_store = CacheStore(CACHE_DB, legacy_file=LEGACY_CACHE_FILE)
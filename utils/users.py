@@ -0,0 +1,74 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from utils.storage import SQLiteDB, migrate_legacy_json
+
+USERS_DB = "users.db"
+LEGACY_USERS_FILE = "users.json"
+HOT_USERS = 10000  # Сколько пользователей держать в памяти
+
+
+class UserManager:
+    """Реестр пользователей в SQLite с LRU-кэшем активных пользователей.
+
+    Регистрация пишет одну строку, чтение идёт из памяти или по первичному ключу;
+    обращения к базе выполняются вне event loop.
+    """
+
+    def __init__(self, path: str = USERS_DB, legacy_file: Optional[str] = LEGACY_USERS_FILE,
+                 cache_size: int = HOT_USERS):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.cache_size = cache_size
+        self._hot: "OrderedDict[str, dict]" = OrderedDict()
+        self._db = SQLiteDB(path, [
+            "CREATE TABLE IF NOT EXISTS users ("
+            "user_id TEXT PRIMARY KEY, name TEXT, phone TEXT, registered_at REAL)",
+        ], on_open=self._migrate_legacy_file)
+
+    def _migrate_legacy_file(self, conn: sqlite3.Connection):
+        """Однократно переносит пользователей из старого users.json."""
+        now = time.time()
+        migrate_legacy_json(
+            conn, self.legacy_file, "INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+            lambda legacy: [(user_id, user.get("name"), user.get("phone"), now) for user_id, user in legacy.items()],
+        )
+
+    @staticmethod
+    def _select(conn: sqlite3.Connection, user_id: str) -> Optional[dict]:
+        row = conn.execute("SELECT name, phone FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return {"name": row[0], "phone": row[1]} if row else None
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, user_id: str, user: dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
+            (user_id, user["name"], user["phone"], time.time()),
+        )
+        conn.commit()
+
+    def _remember(self, user_id: str, user: dict):
+        self._hot[user_id] = user
+        self._hot.move_to_end(user_id)
+        if len(self._hot) > self.cache_size:
+            self._hot.popitem(last=False)
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        user = self._hot.get(user_id)
+        if user is not None:
+            self._hot.move_to_end(user_id)
+            return user
+        user = await self._db.run(self._select, user_id)
+        if user is not None:
+            self._remember(user_id, user)
+        return user
+
+    async def add_user(self, user_id: str, name: str, phone: str):
+        user = {"name": name, "phone": phone}
+        await self._db.run(self._insert, user_id, user)
+        self._remember(user_id, user)
+
+    def close(self):
+        self._db.close()
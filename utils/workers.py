@@ -0,0 +1,67 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from utils.metrics import extract_seconds, extract_wait_seconds
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class ExtractionPool:
+    """Пул для разбора HTML вне event loop.
+
+    mode="thread" - потоки (по умолчанию), mode="process" - отдельные процессы,
+    которые не делят GIL с ботом. Число одновременно принятых задач ограничено
+    max_pending: остальные ждут своей очереди, не накапливая HTML в памяти пула.
+    Функции для mode="process" должны быть объявлены на уровне модуля.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, mode: str = "thread", max_pending: Optional[int] = None):
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.configure(workers, mode, max_pending)
+
+    def configure(self, workers: int = DEFAULT_WORKERS, mode: str = "thread", max_pending: Optional[int] = None):
+        """Меняет параметры пула; запущенный пул останавливается и создаётся заново при следующей задаче."""
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Неизвестный режим пула: {mode}")
+        self.shutdown()
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.max_pending = max_pending or self.workers * 4
+
+    def _start(self):
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extract")
+        self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Выполняет func(*args) в пуле и возвращает результат."""
+        if self._executor is None:
+            self._start()
+        name = getattr(func, "__name__", "other")
+        start = time.perf_counter()
+        async with self._slots:
+            started = time.perf_counter()
+            extract_wait_seconds.observe(started - start, func=name)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, func, *args)
+            finally:
+                extract_seconds.observe(time.perf_counter() - started, func=name)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+
+extraction_pool = ExtractionPool()